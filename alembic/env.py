@@ -13,7 +13,7 @@ from app.core.config import settings
 from app.core.database import Base
 
 # Import all models so they're registered with Base.metadata
-from app.models import User, File
+from app.models import User, File, Blob, CounterFlush
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,45 @@
+"""add content-addressed blobs
+
+Revision ID: add_blobs
+Revises: add_file_renditions
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_blobs'
+down_revision = 'add_file_renditions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create blobs table
+    op.create_table('blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('object_path', sa.String(), nullable=False),
+        sa.Column('file_size', sa.Float(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_blobs_id'), 'blobs', ['id'], unique=False)
+    op.create_index(op.f('ix_blobs_content_hash'), 'blobs', ['content_hash'], unique=True)
+    
+    # Existing files keep their own objects and are not deduplicated
+    op.add_column('files', sa.Column('blob_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_files_blob_id'), 'files', ['blob_id'], unique=False)
+    op.create_foreign_key('fk_files_blob_id', 'files', 'blobs', ['blob_id'], ['id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('fk_files_blob_id', 'files', type_='foreignkey')
+    op.drop_index(op.f('ix_files_blob_id'), table_name='files')
+    op.drop_column('files', 'blob_id')
+    op.drop_index(op.f('ix_blobs_content_hash'), table_name='blobs')
+    op.drop_index(op.f('ix_blobs_id'), table_name='blobs')
+    op.drop_table('blobs')
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""add counter_flushes
+
+Revision ID: add_counter_flushes
+Revises: add_file_content_updated_at
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_counter_flushes'
+down_revision = 'add_file_content_updated_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('counter_flushes',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('batch_id', sa.String(length=32), nullable=False),
+        sa.Column('flushed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('counter_flushes')
@@ -0,0 +1,24 @@
+"""add content_updated_at to files
+
+Revision ID: add_file_content_updated_at
+Revises: add_blobs
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_file_content_updated_at'
+down_revision = 'add_blobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('content_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('files', 'content_updated_at')
@@ -0,0 +1,24 @@
+"""add processing status to files
+
+Revision ID: add_file_processing_status
+Revises: add_verification_tokens
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_file_processing_status'
+down_revision = 'add_verification_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('processing_status', sa.String(), nullable=True, server_default='ready'))
+
+
+def downgrade() -> None:
+    op.drop_column('files', 'processing_status')
\ No newline at end of file
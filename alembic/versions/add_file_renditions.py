@@ -0,0 +1,24 @@
+"""add renditions to files
+
+Revision ID: add_file_renditions
+Revises: add_file_processing_status
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_file_renditions'
+down_revision = 'add_file_processing_status'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('renditions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('files', 'renditions')
\ No newline at end of file
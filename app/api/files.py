@@ -1,18 +1,405 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File as FastAPIFile, Form
-from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File as FastAPIFile, Form, Query, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import io
-from app.core.deps import get_db, get_current_active_user, get_current_verified_user
+import os
+import uuid
+from app.core.cache import derivative_cache, object_cache, presigned_url_cache
+from app.core.deps import (
+    get_db, get_current_active_user, get_current_superuser,
+    get_current_user_optional, get_current_verified_user
+)
 from app.core.storage import storage_client
+from app.core.storage_fallback import ObjectStream, local_storage_client
 from app.models.user import User as UserModel
 from app.models.file import File as FileModel
-from app.schemas.file import File, FileList, FileUpdate, FileUploadResponse
+from app.core.config import settings
+from app.schemas.file import (
+    File, FileList, FileUpdate, FileUploadResponse, FileUploadResult,
+    UploadSessionCreate, UploadSessionStatus,
+    DirectUploadCreate, DirectUploadStatus, DirectUploadComplete,
+    FileArchiveRequest
+)
+from app.services.archive_service import ArchiveService
+from app.services.direct_upload_service import DirectUploadService
 from app.services.file_service import FileService
+from app.services.image_service import ImageService
+from app.services.upload_session_service import UploadSessionService
+from app.utils.http import http_date, if_range_matches, is_not_modified, parse_range
+from app.utils.image import ImageProcessor
+from app.utils.responses import SendfileResponse
+from app.utils.stream import ByteRangesStream
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
 
+def _to_upload_response(uploaded_file: FileModel) -> FileUploadResponse:
+    download_url = FileService.get_file_download_url(uploaded_file)
+    rendition_urls = FileService.get_rendition_urls(uploaded_file)
+    
+    return FileUploadResponse(
+        id=uploaded_file.id,
+        filename=uploaded_file.filename,
+        original_filename=uploaded_file.original_filename,
+        file_size=uploaded_file.file_size,
+        content_type=uploaded_file.content_type,
+        download_url=download_url or "",
+        thumbnail_url=rendition_urls.get("thumbnail"),
+        rendition_urls=rendition_urls,
+        processing_status=uploaded_file.processing_status or "ready",
+        created_at=uploaded_file.created_at
+    )
+
+
+def _to_session_status(session: dict) -> UploadSessionStatus:
+    return UploadSessionStatus(
+        id=session["id"],
+        filename=session["filename"],
+        file_size=session["file_size"],
+        offset=session["offset"],
+        chunk_size=settings.upload_part_size,
+        expires_at=session["expires_at"]
+    )
+
+
+def _get_owned_session(session_id: str, current_user: UserModel) -> dict:
+    session = UploadSessionService.get_session(session_id)
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    
+    if session["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to access this upload"
+        )
+    
+    return session
+
+
+def _to_direct_upload_status(upload: dict) -> DirectUploadStatus:
+    return DirectUploadStatus(
+        id=upload["id"],
+        filename=upload["filename"],
+        file_size=upload["file_size"],
+        upload_url=upload["upload_url"],
+        part_size=settings.upload_part_size if upload["multipart_id"] else None,
+        parts=[
+            {"part_number": part_number, "url": url}
+            for part_number, url in upload["part_urls"]
+        ],
+        expires_at=upload["expires_at"]
+    )
+
+
+def _get_owned_direct_upload(upload_id: str, current_user: UserModel) -> dict:
+    upload = DirectUploadService.get_upload(upload_id)
+    
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    
+    if upload["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to access this upload"
+        )
+    
+    return upload
+
+
+def _check_read_access(file: FileModel, current_user: Optional[UserModel]) -> None:
+    """Public files are readable by anyone, private ones only by their owner"""
+    if file.is_public:
+        return
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required for private files",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if file.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to access this file"
+        )
+
+
+def _validator_headers(etag: str, last_modified: datetime, cache_control: str) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": cache_control
+    }
+
+
+def _not_modified(request: Request, headers: dict, last_modified: datetime) -> Optional[Response]:
+    """304 for a request whose validators still match, decided before storage is touched"""
+    if not is_not_modified(
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since"),
+        headers["ETag"],
+        last_modified
+    ):
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def _content_cache_control(file: FileModel, max_age: int = 0) -> str:
+    visibility = "public" if file.is_public else "private"
+    if max_age:
+        return f"{visibility}, max-age={max_age}"
+    return f"{visibility}, no-cache"
+
+
+async def _open_object(object_path: str, offset: int = 0, length: Optional[int] = None) -> ObjectStream:
+    stream = await run_in_threadpool(storage_client.iter_file, object_path, None, offset, length)
+    if stream is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found in storage"
+        )
+    return stream
+
+
+def _stream_response(
+    stream: ObjectStream,
+    media_type: str,
+    headers: dict,
+    status_code: int = status.HTTP_200_OK
+) -> StreamingResponse:
+    """Stream a stored object, releasing it even if the client disconnects early"""
+    if stream.size is not None:
+        headers["Content-Length"] = str(stream.size)
+    return StreamingResponse(
+        iter(stream),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(stream.close)
+    )
+
+
+async def _requested_ranges(
+    request: Request,
+    object_path: str,
+    etag: str,
+    last_modified: datetime,
+    size: Optional[int] = None
+) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+    """Byte ranges to serve for the request's Range header, and the object size"""
+    range_header = request.headers.get("range")
+    if not range_header or not if_range_matches(request.headers.get("if-range"), etag, last_modified):
+        return None, 0
+    
+    if size is None:
+        stat = await run_in_threadpool(storage_client.stat_file, object_path)
+        if not stat:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found in storage"
+            )
+        size = stat["size"]
+    
+    ranges = parse_range(range_header, size)
+    if ranges == []:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return ranges, size
+
+
+async def _read_cached_object(file: FileModel) -> Optional[bytes]:
+    """Bytes of a small object from the per-worker hot-object cache, filled on a miss"""
+    if file.file_size > settings.object_cache_max_item_size:
+        return None
+    
+    key = FileService.object_cache_key(file)
+    data = object_cache.get(key)
+    if data is None:
+        data = await run_in_threadpool(storage_client.download_file, file.file_path)
+        if data:
+            object_cache.set(key, data)
+    return data
+
+
+def _bytes_response(
+    data: bytes,
+    ranges: Optional[List[Tuple[int, int]]],
+    media_type: str,
+    headers: dict
+) -> Response:
+    if not ranges:
+        return Response(content=data, media_type=media_type, headers=headers)
+    
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return Response(
+            content=data[start:end + 1],
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers
+        )
+    
+    body = ByteRangesStream(
+        lambda offset, length: ObjectStream(io.BytesIO(data[offset:offset + length]), length, length),
+        ranges,
+        len(data),
+        media_type,
+        uuid.uuid4().hex
+    )
+    return Response(
+        content=b"".join(body),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=body.content_type,
+        headers=headers
+    )
+
+
+def _byte_ranges(object_path: str, ranges: List[Tuple[int, int]], size: int, media_type: str) -> ByteRangesStream:
+    return ByteRangesStream(
+        lambda offset, length: storage_client.iter_file(object_path, None, offset, length),
+        ranges,
+        size,
+        media_type,
+        uuid.uuid4().hex
+    )
+
+
+async def _sendfile_response(
+    path: str,
+    ranges: Optional[List[Tuple[int, int]]],
+    size: int,
+    media_type: str,
+    headers: dict
+) -> SendfileResponse:
+    """Serve an object straight from the local storage fallback's filesystem"""
+    if not ranges:
+        size = await run_in_threadpool(os.path.getsize, path)
+        return SendfileResponse(path, [(0, size)], media_type=media_type, headers=headers)
+    
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        segments = [(start, end - start + 1)]
+    else:
+        body = _byte_ranges(path, ranges, size, media_type)
+        segments = body.segments()
+        media_type = body.content_type
+    
+    return SendfileResponse(
+        path,
+        segments,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+async def _presigned_download_url(file: FileModel, filename: str, media_type: str) -> Optional[str]:
+    """Short-lived MinIO URL for the object, or None when the local fallback is active"""
+    if not await run_in_threadpool(storage_client.uses_object_storage):
+        return None
+    return await run_in_threadpool(
+        storage_client.get_file_url,
+        file.file_path,
+        settings.download_url_expires,
+        {
+            "response-content-type": media_type,
+            "response-content-disposition": f"attachment; filename={filename}"
+        }
+    )
+
+
+async def _download_response(request: Request, db: Session, file: FileModel) -> Response:
+    filename = file.original_filename
+    media_type = file.content_type
+    format = None
+    headers = {}
+    
+    if file.is_image:
+        headers["Vary"] = "Accept"
+        format = ImageService.negotiate_format(request.headers.get("accept"), media_type)
+    
+    etag = FileService.content_etag(file, f"original.{format}" if format else None)
+    last_modified = FileService.content_modified(file)
+    headers.update(_validator_headers(etag, last_modified, _content_cache_control(file)))
+    not_modified = _not_modified(request, headers, last_modified)
+    if not_modified:
+        return not_modified
+    
+    file_data = await ImageService.get_variant(file, file.file_path, "original", format) if format else None
+    if file_data:
+        filename = f"{os.path.splitext(filename)[0]}.{format}"
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+        await run_in_threadpool(FileService.increment_download_count, db, file)
+        return Response(
+            content=file_data,
+            media_type=ImageProcessor.OUTPUT_FORMATS[format],
+            headers=headers
+        )
+    elif format:
+        # Variant generation failed, so the source is served under its own validator
+        headers["ETag"] = etag = FileService.content_etag(file)
+    
+    if settings.download_mode == "redirect":
+        url = await _presigned_download_url(file, filename, media_type)
+        if url:
+            await run_in_threadpool(FileService.increment_download_count, db, file)
+            return RedirectResponse(
+                url,
+                status_code=status.HTTP_302_FOUND,
+                headers={"Cache-Control": "private, no-store"}
+            )
+    
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    local_path = await run_in_threadpool(storage_client.local_path, file.file_path)
+    data = None if local_path else await _read_cached_object(file)
+    ranges, size = await _requested_ranges(
+        request, file.file_path, etag, last_modified, len(data) if data else None
+    )
+    
+    if local_path:
+        response = await _sendfile_response(local_path, ranges, size, media_type, headers)
+    elif data:
+        response = _bytes_response(data, ranges, media_type, headers)
+    elif not ranges:
+        response = _stream_response(await _open_object(file.file_path), media_type, headers)
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        stream = await _open_object(file.file_path, start, end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response = _stream_response(stream, media_type, headers, status.HTTP_206_PARTIAL_CONTENT)
+    else:
+        body = _byte_ranges(file.file_path, ranges, size, media_type)
+        headers["Content-Length"] = str(body.content_length)
+        response = StreamingResponse(
+            iter(body),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=body.content_type,
+            headers=headers,
+            background=BackgroundTask(body.close)
+        )
+    
+    # Resumed and seeking reads are not counted as separate downloads
+    if not ranges or ranges[0][0] == 0:
+        await run_in_threadpool(FileService.increment_download_count, db, file)
+    return response
+
+
 @router.post("/upload", response_model=FileUploadResponse)
 async def upload_file(
     file: UploadFile = FastAPIFile(...),
@@ -36,20 +423,7 @@ async def upload_file(
                 detail="Failed to upload file"
             )
         
-        # Get download URL
-        download_url = FileService.get_file_download_url(uploaded_file)
-        thumbnail_url = FileService.get_thumbnail_url(uploaded_file) if uploaded_file.is_image else None
-        
-        return FileUploadResponse(
-            id=uploaded_file.id,
-            filename=uploaded_file.filename,
-            original_filename=uploaded_file.original_filename,
-            file_size=uploaded_file.file_size,
-            content_type=uploaded_file.content_type,
-            download_url=download_url or "",
-            thumbnail_url=thumbnail_url,
-            created_at=uploaded_file.created_at
-        )
+        return _to_upload_response(uploaded_file)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -57,48 +431,287 @@ async def upload_file(
         )
 
 
-@router.post("/upload-multiple", response_model=List[FileUploadResponse])
+@router.post("/upload-multiple", response_model=List[FileUploadResult])
 async def upload_multiple_files(
     files: List[UploadFile] = FastAPIFile(...),
     is_public: bool = Form(False),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_verified_user)
 ):
-    if len(files) > 10:
+    if len(files) > settings.max_files_per_upload:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximum {settings.max_files_per_upload} files can be uploaded at once"
+        )
+    
+    # One result per file, in request order, so clients know what to retry
+    results = await FileService.upload_files(
+        db=db,
+        files=files,
+        user=current_user,
+        is_public=is_public
+    )
+    
+    return [
+        FileUploadResult(
+            filename=file.filename,
+            success=uploaded_file is not None,
+            file=_to_upload_response(uploaded_file) if uploaded_file else None,
+            error=error
+        )
+        for file, (uploaded_file, error) in zip(files, results)
+    ]
+
+
+@router.post("/upload-archive", response_model=List[FileUploadResult])
+async def upload_archive(
+    file: UploadFile = FastAPIFile(...),
+    is_public: bool = Form(False),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    try:
+        results = await ArchiveService.upload_archive(
+            db=db,
+            archive_file=file,
+            user=current_user,
+            is_public=is_public
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # One result per archive entry, named by its path inside the archive
+    return [
+        FileUploadResult(
+            filename=entry_name,
+            success=uploaded_file is not None,
+            file=_to_upload_response(uploaded_file) if uploaded_file else None,
+            error=error
+        )
+        for entry_name, uploaded_file, error in results
+    ]
+
+
+@router.post("/uploads", response_model=UploadSessionStatus)
+def create_upload_session(
+    session_data: UploadSessionCreate,
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    try:
+        session = UploadSessionService.create_session(current_user, session_data)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Maximum 10 files can be uploaded at once"
+            detail=str(e)
+        )
+    
+    return _to_session_status(session)
+
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionStatus)
+def get_upload_session(
+    session_id: str,
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    session = _get_owned_session(session_id, current_user)
+    return _to_session_status(session)
+
+
+@router.put("/uploads/{session_id}", response_model=UploadSessionStatus)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    _get_owned_session(session_id, current_user)
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.upload_part_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Chunk exceeds maximum size of {settings.upload_part_size} bytes"
+        )
+    
+    data = await request.body()
+    
+    try:
+        session = await run_in_threadpool(UploadSessionService.upload_chunk, session_id, offset, data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return _to_session_status(session)
+
+
+@router.post("/uploads/{session_id}/complete", response_model=FileUploadResponse)
+async def complete_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    session = _get_owned_session(session_id, current_user)
+    
+    try:
+        uploaded_file = await UploadSessionService.complete_session(db, session, current_user)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return _to_upload_response(uploaded_file)
+
+
+@router.delete("/uploads/{session_id}")
+def abort_upload_session(
+    session_id: str,
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    session = _get_owned_session(session_id, current_user)
+    UploadSessionService.abort_session(session)
+    return {"message": "Upload aborted"}
+
+
+@router.post("/direct-uploads", response_model=DirectUploadStatus)
+def create_direct_upload(
+    upload_data: DirectUploadCreate,
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    try:
+        upload = DirectUploadService.create_upload(current_user, upload_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return _to_direct_upload_status(upload)
+
+
+@router.get("/direct-uploads/{upload_id}", response_model=DirectUploadStatus)
+def get_direct_upload(
+    upload_id: str,
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    upload = _get_owned_direct_upload(upload_id, current_user)
+    return _to_direct_upload_status(upload)
+
+
+@router.post("/direct-uploads/{upload_id}/complete", response_model=FileUploadResponse)
+async def complete_direct_upload(
+    upload_id: str,
+    completion: Optional[DirectUploadComplete] = None,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    upload = _get_owned_direct_upload(upload_id, current_user)
+    parts = [(part.part_number, part.etag) for part in completion.parts] if completion else None
+    
+    try:
+        uploaded_file = await DirectUploadService.complete_upload(db, upload, current_user, parts)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return _to_upload_response(uploaded_file)
+
+
+@router.delete("/direct-uploads/{upload_id}")
+def abort_direct_upload(
+    upload_id: str,
+    current_user: UserModel = Depends(get_current_verified_user)
+):
+    upload = _get_owned_direct_upload(upload_id, current_user)
+    DirectUploadService.abort_upload(upload)
+    return {"message": "Upload aborted"}
+
+
+@router.put("/storage/{object_path:path}")
+async def put_local_object(
+    object_path: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+    upload_id: Optional[str] = None,
+    part_number: Optional[int] = Query(None, ge=1),
+):
+    # Stand-in for presigned storage URLs when running on the local fallback
+    if not local_storage_client.verify_upload_signature(
+        object_path, expires, signature, upload_id, part_number
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired upload signature"
+        )
+    
+    data = await request.body()
+    etag = await run_in_threadpool(
+        DirectUploadService.store_local_upload, object_path, data, upload_id, part_number
+    )
+    
+    if not etag:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to store upload"
+        )
+    
+    return Response(status_code=status.HTTP_200_OK, headers={"ETag": f'"{etag}"'})
+
+
+@router.post("/archive")
+async def download_archive(
+    archive_request: FileArchiveRequest,
+    db: Session = Depends(get_db),
+    current_user: Optional[UserModel] = Depends(get_current_user_optional)
+):
+    try:
+        files = ArchiveService.get_archive_files(
+            db,
+            current_user,
+            archive_request.file_ids,
+            archive_request.content_type
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     
-    uploaded_files = []
     for file in files:
-        try:
-            uploaded_file = await FileService.upload_file(
-                db=db,
-                file=file,
-                user=current_user,
-                is_public=is_public
-            )
-            
-            if uploaded_file:
-                download_url = FileService.get_file_download_url(uploaded_file)
-                thumbnail_url = FileService.get_thumbnail_url(uploaded_file) if uploaded_file.is_image else None
-                
-                uploaded_files.append(FileUploadResponse(
-                    id=uploaded_file.id,
-                    filename=uploaded_file.filename,
-                    original_filename=uploaded_file.original_filename,
-                    file_size=uploaded_file.file_size,
-                    content_type=uploaded_file.content_type,
-                    download_url=download_url or "",
-                    thumbnail_url=thumbnail_url,
-                    created_at=uploaded_file.created_at
-                ))
-        except ValueError as e:
-            # Skip files that fail validation
-            continue
-    
-    return uploaded_files
+        await run_in_threadpool(FileService.increment_download_count, db, file)
+    
+    body = ArchiveService.zip_stream(files)
+    filename = os.path.basename(archive_request.filename) or "files.zip"
+    return StreamingResponse(
+        iter(body),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Cache-Control": "private, no-store"
+        },
+        background=BackgroundTask(body.close)
+    )
+
+
+@router.get("/cache/stats")
+def get_cache_stats(
+    current_user: UserModel = Depends(get_current_superuser)
+):
+    # Caches are per worker, so these only describe the worker that answers
+    return {
+        "worker_pid": os.getpid(),
+        "objects": object_cache.stats(),
+        "derivatives": derivative_cache.stats(),
+        "presigned_urls": presigned_url_cache.stats()
+    }
 
 
 @router.get("/", response_model=FileList)
@@ -108,7 +721,7 @@ def get_user_files(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
-    files = FileService.get_user_files(db, current_user.id, skip, limit)
+    files = FileService.with_live_download_counts(FileService.get_user_files(db, current_user.id, skip, limit))
     total = db.query(FileModel).filter(FileModel.user_id == current_user.id).count()
     
     return FileList(
@@ -125,7 +738,7 @@ def get_public_files(
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    files = FileService.get_public_files(db, skip, limit)
+    files = FileService.with_live_download_counts(FileService.get_public_files(db, skip, limit))
     total = db.query(FileModel).filter(FileModel.is_public == True).count()
     
     return FileList(
@@ -139,6 +752,8 @@ def get_public_files(
 @router.get("/{file_id}", response_model=File)
 def get_file_info(
     file_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
@@ -157,16 +772,31 @@ def get_file_info(
             detail="You don't have permission to access this file"
         )
     
+    FileService.with_live_download_counts([file])
+    last_modified = file.updated_at or file.created_at
+    headers = _validator_headers(FileService.metadata_etag(file), last_modified, "private, no-cache")
+    not_modified = _not_modified(request, headers, last_modified)
+    if not_modified:
+        return not_modified
+    
+    response.headers.update(headers)
     return file
 
 
 @router.get("/download/{filename}")
-def download_file_by_name(
+async def download_file_by_name(
     filename: str,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     # Find file by filename
     file = db.query(FileModel).filter(FileModel.filename == filename).first()
+    if not file:
+        # Local storage URLs of shared blobs end in the content hash
+        file = db.query(FileModel).filter(FileModel.file_path.in_([
+            FileService.blob_object_path(filename),
+            FileService.rendition_object_path("optimized", filename)
+        ])).first()
     
     if not file:
         raise HTTPException(
@@ -174,69 +804,138 @@ def download_file_by_name(
             detail="File not found"
         )
     
-    # Get file from storage
-    file_data = storage_client.download_file(file.file_path)
+    return await _download_response(request, db, file)
+
+
+@router.get("/{file_id}/download")
+async def download_file(
+    file_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Optional[UserModel] = Depends(get_current_user_optional)
+):
+    file = FileService.get_file(db, file_id)
     
-    if not file_data:
+    if not file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found in storage"
+            detail="File not found"
+        )
+    
+    _check_read_access(file, current_user)
+    return await _download_response(request, db, file)
+
+
+@router.get("/{file_id}/renditions/{name}")
+async def get_file_rendition(
+    file_id: int,
+    name: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Optional[UserModel] = Depends(get_current_user_optional)
+):
+    file = FileService.get_file(db, file_id)
+    
+    if not file or not file.is_image:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
         )
     
-    # Increment download count
-    FileService.increment_download_count(db, file)
+    _check_read_access(file, current_user)
     
-    # Return file
-    return StreamingResponse(
-        io.BytesIO(file_data),
-        media_type=file.content_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={file.original_filename}"
-        }
-    )
+    object_path = FileService.get_rendition_paths(file).get(name)
+    if not object_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown rendition '{name}'"
+        )
+    
+    media_type = file.content_type if object_path == file.file_path else "image/jpeg"
+    format = ImageService.negotiate_format(request.headers.get("accept"), media_type)
+    
+    # The path is part of the validator, so a rendition that finishes processing gets a new ETag
+    last_modified = file.updated_at or file.created_at
+    etag = FileService.content_etag(file, f"{name}:{object_path}.{format or 'source'}")
+    headers = {"Vary": "Accept"}
+    headers.update(_validator_headers(etag, last_modified, _content_cache_control(file, 86400)))
+    not_modified = _not_modified(request, headers, last_modified)
+    if not_modified:
+        return not_modified
+    
+    file_data = await ImageService.get_variant(file, object_path, name, format) if format else None
+    if file_data:
+        return Response(
+            content=file_data,
+            media_type=ImageProcessor.OUTPUT_FORMATS[format],
+            headers=headers
+        )
+    elif format:
+        headers["ETag"] = FileService.content_etag(file, f"{name}:{object_path}.source")
+    
+    stream = await _open_object(object_path)
+    return _stream_response(stream, media_type, headers)
 
 
-@router.get("/{file_id}/download")
-def download_file(
+@router.get("/{file_id}/image")
+async def get_file_image(
     file_id: int,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1),
+    h: Optional[int] = Query(None, ge=1),
+    fit: str = "contain",
+    format: Optional[str] = None,
+    q: Optional[int] = Query(None, ge=1, le=100),
     db: Session = Depends(get_db),
+    current_user: Optional[UserModel] = Depends(get_current_user_optional)
 ):
     file = FileService.get_file(db, file_id)
     
-    if not file:
+    if not file or not file.is_image:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found"
         )
     
-    # For now, allow access to all files for testing
-    # TODO: Implement proper authentication for private files
-    # Check if file is public or user owns it
-    # if not file.is_public:
-    #     raise HTTPException(
-    #         status_code=status.HTTP_401_UNAUTHORIZED,
-    #         detail="Authentication required for private files"
-    #     )
+    _check_read_access(file, current_user)
+    
+    # Without an explicit format, pick one from the Accept header
+    negotiated = format is None
+    if negotiated:
+        format = ImageService.negotiate_format(request.headers.get("accept"), "image/jpeg")
+    
+    try:
+        transform = ImageService.normalize_transform(w, h, fit, format, q)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    last_modified = FileService.content_modified(file)
+    headers = _validator_headers(
+        FileService.content_etag(file, transform.name),
+        last_modified,
+        _content_cache_control(file, 86400)
+    )
+    if negotiated:
+        headers["Vary"] = "Accept"
+    not_modified = _not_modified(request, headers, last_modified)
+    if not_modified:
+        return not_modified
     
-    # Get file from storage
-    file_data = storage_client.download_file(file.file_path)
+    image_data = await ImageService.get_transformed(file, transform)
     
-    if not file_data:
+    if not image_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found in storage"
         )
     
-    # Increment download count
-    FileService.increment_download_count(db, file)
-    
-    # Return file
-    return StreamingResponse(
-        io.BytesIO(file_data),
-        media_type=file.content_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={file.original_filename}"
-        }
+    return Response(
+        content=image_data,
+        media_type=transform.media_type,
+        headers=headers
     )
 
 
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+from app.core.config import settings
+
+
+class ByteLRUCache:
+    """Per-process LRU cache of byte strings bounded by their total size"""
+    
+    def __init__(self, max_bytes: int, max_item_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: bytes) -> bool:
+        if len(value) > self.max_item_bytes or len(value) > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._items[key] = value
+            self.current_bytes += len(value)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+            return True
+    
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is None:
+                return False
+            self.current_bytes -= len(value)
+            return True
+    
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [key for key in self._items if key.startswith(prefix)]
+            for key in keys:
+                self.current_bytes -= len(self._items.pop(key))
+            return len(keys)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "max_item_bytes": self.max_item_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Global cache of transformed images
+derivative_cache = ByteLRUCache(
+    settings.derivative_cache_size,
+    settings.derivative_cache_max_item_size
+)
+
+# Global cache of small, frequently downloaded objects
+object_cache = ByteLRUCache(
+    settings.object_cache_size,
+    settings.object_cache_max_item_size
+)
+
+# Global cache of presigned download URLs, keyed by object and signing window
+presigned_url_cache = ByteLRUCache(
+    settings.presigned_url_cache_size,
+    4096
+)
@@ -35,8 +35,36 @@ class Settings(BaseSettings):
     
     # File Upload
     max_file_size: int = Field(default=10485760, env="MAX_FILE_SIZE")  # 10MB
+    max_files_per_upload: int = Field(default=10, env="MAX_FILES_PER_UPLOAD")
+    max_archive_size: int = Field(default=104857600, env="MAX_ARCHIVE_SIZE")  # 100MB
+    max_archive_entries: int = Field(default=1000, env="MAX_ARCHIVE_ENTRIES")
+    max_archive_ratio: int = Field(default=100, env="MAX_ARCHIVE_RATIO")  # expanded / compressed size
     allowed_extensions: str = Field(default="jpg,jpeg,png,gif,pdf,txt,doc,docx", env="ALLOWED_EXTENSIONS")
     upload_dir: str = Field(default="uploads", env="UPLOAD_DIR")
+    upload_part_size: int = Field(default=5242880, env="UPLOAD_PART_SIZE")  # 5MB, S3 multipart minimum
+    upload_chunk_size: int = Field(default=1048576, env="UPLOAD_CHUNK_SIZE")  # 1MB
+    direct_upload_expires: int = Field(default=3600, env="DIRECT_UPLOAD_EXPIRES")  # presigned URL lifetime in seconds
+    upload_batch_concurrency: int = Field(default=4, env="UPLOAD_BATCH_CONCURRENCY")  # files per /upload-multiple processed at once
+    upload_session_ttl: int = Field(default=86400, env="UPLOAD_SESSION_TTL")  # 24 hours
+    
+    # Image processing
+    image_process_workers: int = Field(default=2, env="IMAGE_PROCESS_WORKERS")
+    image_queue_size: int = Field(default=16, env="IMAGE_QUEUE_SIZE")
+    image_queue_timeout: float = Field(default=30.0, env="IMAGE_QUEUE_TIMEOUT")  # seconds
+    image_resize_quality: str = Field(default="balanced", env="IMAGE_RESIZE_QUALITY")  # fast, balanced, best
+    derivative_mode: str = Field(default="inline", env="DERIVATIVE_MODE")  # inline or queue
+    image_transform_sizes: str = Field(default="64,128,200,320,480,640,800,1024,1280,1600,1920", env="IMAGE_TRANSFORM_SIZES")
+    image_transform_qualities: str = Field(default="60,75,85,95", env="IMAGE_TRANSFORM_QUALITIES")
+    image_negotiate_formats: str = Field(default="avif,webp", env="IMAGE_NEGOTIATE_FORMATS")  # empty disables
+    derivative_cache_size: int = Field(default=67108864, env="DERIVATIVE_CACHE_SIZE")  # 64MB per worker
+    derivative_cache_max_item_size: int = Field(default=2097152, env="DERIVATIVE_CACHE_MAX_ITEM_SIZE")  # 2MB
+    download_mode: str = Field(default="proxy", env="DOWNLOAD_MODE")  # proxy or redirect
+    download_url_expires: int = Field(default=300, env="DOWNLOAD_URL_EXPIRES")  # seconds
+    download_count_flush_interval: int = Field(default=10, env="DOWNLOAD_COUNT_FLUSH_INTERVAL")  # seconds
+    presigned_url_window: int = Field(default=600, env="PRESIGNED_URL_WINDOW")  # seconds
+    presigned_url_cache_size: int = Field(default=1048576, env="PRESIGNED_URL_CACHE_SIZE")  # 1MB
+    object_cache_size: int = Field(default=33554432, env="OBJECT_CACHE_SIZE")  # 32MB per worker
+    object_cache_max_item_size: int = Field(default=1048576, env="OBJECT_CACHE_MAX_ITEM_SIZE")  # 1MB
     
     # App
     app_name: str = Field(default="Auth File API", env="APP_NAME")
@@ -47,6 +75,18 @@ class Settings(BaseSettings):
     def allowed_extensions_list(self) -> list[str]:
         return [ext.strip().lower() for ext in self.allowed_extensions.split(",")]
     
+    @property
+    def image_transform_sizes_list(self) -> list[int]:
+        return sorted(int(size) for size in self.image_transform_sizes.split(","))
+    
+    @property
+    def image_transform_qualities_list(self) -> list[int]:
+        return sorted(int(quality) for quality in self.image_transform_qualities.split(","))
+    
+    @property
+    def image_negotiate_formats_list(self) -> list[str]:
+        return [fmt.strip().lower() for fmt in self.image_negotiate_formats.split(",") if fmt.strip()]
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -10,6 +10,7 @@ from app.models.user import User as UserModel
 from app.schemas.auth import TokenPayload
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -51,6 +52,19 @@ def get_current_user(
     return user
 
 
+def get_current_user_optional(
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+) -> Optional[UserModel]:
+    """The authenticated user, or None for anonymous and invalid credentials"""
+    if not token:
+        return None
+    try:
+        return get_current_user(db, token)
+    except HTTPException:
+        return None
+
+
 def get_current_active_user(
     current_user: UserModel = Depends(get_current_user),
 ) -> UserModel:
@@ -48,7 +48,8 @@ def add_error_handlers(app: FastAPI):
                 "error": exc.detail,
                 "status_code": exc.status_code,
                 "path": request.url.path
-            }
+            },
+            headers=getattr(exc, "headers", None)
         )
     
     @app.exception_handler(SQLAlchemyError)
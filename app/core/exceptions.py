@@ -70,10 +70,10 @@ class FileSizeException(APIException):
 
 class FileTypeException(APIException):
     """Invalid file type"""
-    def __init__(self, allowed_types: list):
+    def __init__(self, allowed_types: list, detail: Optional[str] = None):
         super().__init__(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail=f"File type not allowed. Allowed types: {', '.join(allowed_types)}"
+            detail=detail or f"File type not allowed. Allowed types: {', '.join(allowed_types)}"
         )
 
 
@@ -0,0 +1,58 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableException
+
+
+class ImageProcessingPool:
+    """Runs CPU-heavy Pillow work in worker processes, off the event loop.
+    
+    At most ``image_process_workers + image_queue_size`` jobs are admitted at
+    once; callers beyond that wait up to ``image_queue_timeout`` seconds for a
+    slot and are then rejected with 503.
+    """
+    
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start worker processes lazily"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.image_process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(
+                settings.image_process_workers + settings.image_queue_size
+            )
+        return self._slots
+    
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=settings.image_queue_timeout)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailableException("Image processing queue is full, please retry later")
+        
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            slots.release()
+    
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._slots = None
+
+
+# Global image processing pool instance
+image_pool = ImageProcessingPool()
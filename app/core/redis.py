@@ -1,9 +1,22 @@
 import json
-from typing import Optional, Any
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 import redis
 from app.core.config import settings
 
 
+# Deletes a lock only while it still holds the caller's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Field of a taken counter batch holding its id; counter members are numeric ids
+BATCH_FIELD = "batch"
+
+
 class RedisClient:
     def __init__(self):
         self.client = redis.from_url(
@@ -48,6 +61,89 @@ class RedisClient:
             print(f"Redis exists error: {e}")
             return False
     
+    def enqueue(self, queue: str, payload: Any) -> bool:
+        try:
+            self.client.rpush(f"queue:{queue}", json.dumps(payload))
+            return True
+        except Exception as e:
+            print(f"Redis enqueue error: {e}")
+            return False
+    
+    def dequeue(self, queue: str, timeout: int = 5) -> Optional[Any]:
+        """Block up to timeout seconds for the next job"""
+        try:
+            item = self.client.blpop(f"queue:{queue}", timeout=timeout)
+            return json.loads(item[1]) if item else None
+        except Exception as e:
+            print(f"Redis dequeue error: {e}")
+            return None
+    
+    def acquire_lock(self, key: str, expire: int = 30) -> Optional[str]:
+        """Take a short-lived lock shared by all workers; returns its token for release_lock"""
+        token = uuid.uuid4().hex
+        try:
+            return token if self.client.set(f"lock:{key}", token, nx=True, ex=expire) else None
+        except Exception as e:
+            print(f"Redis lock error: {e}")
+            return None
+    
+    def release_lock(self, key: str, token: str) -> bool:
+        """Release a lock unless it expired and was taken by someone else meanwhile"""
+        try:
+            return bool(self.client.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token))
+        except Exception as e:
+            print(f"Redis lock error: {e}")
+            return False
+    
+    def increment_counter(self, name: str, member: Any, amount: int = 1) -> bool:
+        try:
+            self.client.hincrby(f"counter:{name}", member, amount)
+            return True
+        except Exception as e:
+            print(f"Redis counter error: {e}")
+            return False
+    
+    def get_counters(self, name: str, members: List[Any]) -> List[int]:
+        """Pending counts for members, including any batch being flushed"""
+        if not members:
+            return []
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.hmget(f"counter:{name}", members)
+            pipeline.hmget(f"counter:{name}:flushing", members)
+            pending, flushing = pipeline.execute()
+            return [int(a or 0) + int(b or 0) for a, b in zip(pending, flushing)]
+        except Exception as e:
+            print(f"Redis counter error: {e}")
+            return [0] * len(members)
+    
+    def take_counters(self, name: str) -> Tuple[Optional[str], Dict[str, int]]:
+        """Move pending counts aside for flushing and return the batch id and counts.
+        
+        A batch left behind by an interrupted flush is returned again, with
+        the same id, before anything new is taken; call clear_taken_counters
+        once it is applied.
+        """
+        key = f"counter:{name}"
+        flushing = f"{key}:flushing"
+        try:
+            if not self.client.exists(flushing):
+                try:
+                    self.client.rename(key, flushing)
+                except redis.ResponseError:
+                    return None, {}  # nothing pending
+            # Only the first attempt at a batch assigns its id
+            self.client.hsetnx(flushing, BATCH_FIELD, uuid.uuid4().hex)
+            counts = self.client.hgetall(flushing)
+            batch_id = counts.pop(BATCH_FIELD)
+            return batch_id, {member: int(count) for member, count in counts.items()}
+        except Exception as e:
+            print(f"Redis counter error: {e}")
+            return None, {}
+    
+    def clear_taken_counters(self, name: str) -> bool:
+        return self.delete(f"counter:{name}:flushing")
+    
     def set_refresh_token(self, user_id: int, token: str, expire: int = 604800) -> bool:
         """Store refresh token with 7 days expiry by default"""
         key = f"refresh_token:{user_id}:{token[:8]}"
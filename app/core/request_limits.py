@@ -0,0 +1,106 @@
+import json
+import logging
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.exceptions import FileSizeException
+
+logger = logging.getLogger(__name__)
+
+# Allowance for multipart boundaries, part headers and small form fields
+FORM_OVERHEAD = 64 * 1024
+
+BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+
+def get_size_limit(path: str) -> int:
+    """Largest upload accepted for a path, as reported to clients"""
+    if path.endswith("/files/upload-archive"):
+        return settings.max_archive_size
+    if path.endswith("/files/upload-multiple"):
+        return settings.max_files_per_upload * settings.max_file_size
+    return settings.max_file_size
+
+
+def get_body_limit(path: str) -> int:
+    """Largest request body accepted for a path"""
+    if path.endswith("/files/upload-multiple"):
+        return settings.max_files_per_upload * (settings.max_file_size + FORM_OVERHEAD)
+    return get_size_limit(path) + FORM_OVERHEAD
+
+
+class RequestSizeLimitMiddleware:
+    """Reject oversized request bodies before they are spooled to disk.
+    
+    A declared Content-Length over the limit is answered with 413 without
+    reading the body. Bodies without one (chunked transfer encoding) or
+    with a wrong one are counted as they stream in, and reading stops with
+    FileSizeException as soon as the limit is crossed.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in BODY_METHODS:
+            await self.app(scope, receive, send)
+            return
+        
+        limit = get_body_limit(scope["path"])
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            logger.warning(f"Rejected {content_length.decode()} byte body on {scope['path']}")
+            await self._send_too_large(scope, send)
+            return
+        
+        received = 0
+        response_started = False
+        
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise FileSizeException(get_size_limit(scope["path"]))
+            return message
+        
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except FileSizeException:
+            # Raised outside the routes' exception handling
+            if response_started:
+                raise
+            await self._send_too_large(scope, send)
+    
+    @staticmethod
+    async def _send_too_large(scope: Scope, send: Send) -> None:
+        exc = FileSizeException(get_size_limit(scope["path"]))
+        body = json.dumps({
+            "error": exc.detail,
+            "status_code": exc.status_code,
+            "path": scope["path"]
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": exc.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def add_request_size_limit(app):
+    """
+    Add request body size limits to FastAPI app
+    """
+    app.add_middleware(RequestSizeLimitMiddleware)
+    logger.info("Request size limit middleware added")
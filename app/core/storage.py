@@ -1,9 +1,19 @@
+import asyncio
 import io
-from typing import BinaryIO, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
 from minio import Minio
+from minio.datatypes import Part
 from minio.error import S3Error
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import presigned_url_cache
 from app.core.config import settings
-from app.core.storage_fallback import local_storage_client
+from app.core.storage_fallback import ObjectStream, local_storage_client
+
+# S3 signatures are valid for at most seven days
+MAX_PRESIGNED_EXPIRES = 7 * 24 * 3600
 
 
 class MinIOClient:
@@ -64,6 +74,219 @@ class MinIOClient:
                 file_data.seek(0)
             return local_storage_client.upload_file(file_data, object_name, content_type, file_size)
     
+    def upload_stream(
+        self,
+        file_data: BinaryIO,
+        object_name: str,
+        content_type: str
+    ) -> bool:
+        """Upload a stream of unknown length as multipart parts of bounded size"""
+        self._init_client()
+        if not self.client:
+            print("MinIO not available, using local storage fallback")
+            return local_storage_client.upload_stream(file_data, object_name, content_type)
+        try:
+            self.client.put_object(
+                self.bucket_name,
+                object_name,
+                file_data,
+                -1,
+                content_type=content_type,
+                part_size=settings.upload_part_size
+            )
+            return True
+        except S3Error as e:
+            print(f"Error streaming file to MinIO: {e}, falling back to local storage")
+            if hasattr(file_data, 'seek'):
+                file_data.seek(0)
+            return local_storage_client.upload_stream(file_data, object_name, content_type)
+    
+    async def upload_objects(self, objects: List[Tuple[str, bytes, str]]) -> bool:
+        """Upload (object_name, data, content_type) objects concurrently, all or nothing.
+        
+        Each blocking upload runs in the threadpool. If any of them fails,
+        the ones this call created are deleted again before returning False.
+        Objects that already existed are kept: content-addressed paths are
+        shared with other files and were only overwritten with the same bytes.
+        """
+        existing = await asyncio.gather(
+            *(run_in_threadpool(self.stat_file, object_name) for object_name, _, _ in objects),
+            return_exceptions=True
+        )
+        results = await asyncio.gather(
+            *(
+                run_in_threadpool(self.upload_file, io.BytesIO(data), object_name, content_type, len(data))
+                for object_name, data, content_type in objects
+            ),
+            return_exceptions=True
+        )
+        if all(result is True for result in results):
+            return True
+        
+        failed = sum(result is not True for result in results)
+        # A failed stat counts as existing, so an unknown object is never deleted
+        created = [
+            object_name
+            for (object_name, _, _), stat, result in zip(objects, existing, results)
+            if result is True and stat is None
+        ]
+        print(f"Error uploading {failed} of {len(objects)} objects, rolling back")
+        await asyncio.gather(
+            *(run_in_threadpool(self.delete_file, object_name) for object_name in created),
+            return_exceptions=True
+        )
+        return False
+    
+    def create_multipart_upload(self, object_name: str, content_type: str) -> Optional[str]:
+        """Start a multipart upload and return its upload id"""
+        self._init_client()
+        if not self.client:
+            return local_storage_client.create_multipart_upload(object_name, content_type)
+        try:
+            return self.client._create_multipart_upload(
+                self.bucket_name,
+                object_name,
+                {"Content-Type": content_type}
+            )
+        except S3Error as e:
+            print(f"Error creating multipart upload in MinIO: {e}, falling back to local storage")
+            return local_storage_client.create_multipart_upload(object_name, content_type)
+    
+    def upload_part(
+        self,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes
+    ) -> Optional[str]:
+        """Upload one part of a multipart upload and return its ETag"""
+        if local_storage_client.is_local_upload(upload_id):
+            return local_storage_client.upload_part(object_name, upload_id, part_number, data)
+        self._init_client()
+        if not self.client:
+            return None
+        try:
+            return self.client._upload_part(
+                self.bucket_name,
+                object_name,
+                data,
+                {},
+                upload_id,
+                part_number
+            )
+        except S3Error as e:
+            print(f"Error uploading part {part_number} to MinIO: {e}")
+            return None
+    
+    def complete_multipart_upload(
+        self,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]]
+    ) -> bool:
+        """Assemble uploaded parts, given as (part_number, etag) pairs, into the object"""
+        if local_storage_client.is_local_upload(upload_id):
+            return local_storage_client.complete_multipart_upload(object_name, upload_id, parts)
+        self._init_client()
+        if not self.client:
+            return False
+        try:
+            self.client._complete_multipart_upload(
+                self.bucket_name,
+                object_name,
+                upload_id,
+                [Part(part_number, etag) for part_number, etag in parts]
+            )
+            return True
+        except S3Error as e:
+            print(f"Error completing multipart upload in MinIO: {e}")
+            return False
+    
+    def abort_multipart_upload(self, object_name: str, upload_id: str) -> bool:
+        if local_storage_client.is_local_upload(upload_id):
+            return local_storage_client.abort_multipart_upload(object_name, upload_id)
+        self._init_client()
+        if not self.client:
+            return False
+        try:
+            self.client._abort_multipart_upload(self.bucket_name, object_name, upload_id)
+            return True
+        except S3Error as e:
+            print(f"Error aborting multipart upload in MinIO: {e}")
+            return False
+    
+    def get_upload_url(
+        self,
+        object_name: str,
+        expires: int = 3600,
+        upload_id: Optional[str] = None,
+        part_number: Optional[int] = None
+    ) -> Optional[str]:
+        """Presigned PUT URL for the whole object, or for one part of a multipart upload"""
+        if upload_id and local_storage_client.is_local_upload(upload_id):
+            return local_storage_client.get_upload_url(object_name, expires, upload_id, part_number)
+        self._init_client()
+        if not self.client:
+            return local_storage_client.get_upload_url(object_name, expires, upload_id, part_number)
+        try:
+            if upload_id:
+                return self.client.get_presigned_url(
+                    "PUT",
+                    self.bucket_name,
+                    object_name,
+                    expires=timedelta(seconds=expires),
+                    extra_query_params={"uploadId": upload_id, "partNumber": str(part_number)}
+                )
+            return self.client.presigned_put_object(
+                self.bucket_name,
+                object_name,
+                expires=timedelta(seconds=expires)
+            )
+        except S3Error as e:
+            print(f"Error generating MinIO upload URL: {e}")
+            return None
+    
+    def local_path(self, object_name: str) -> Optional[Path]:
+        """Filesystem path of an object when the local fallback is the active backend"""
+        self._init_client()
+        if self.client:
+            return None
+        return local_storage_client.local_path(object_name)
+    
+    def stat_file(self, object_name: str) -> Optional[dict]:
+        """Size, ETag and content type of a stored object, or None if it doesn't exist"""
+        self._init_client()
+        if not self.client:
+            return local_storage_client.stat_file(object_name)
+        try:
+            stat = self.client.stat_object(self.bucket_name, object_name)
+            return {
+                "size": stat.size,
+                "etag": stat.etag,
+                "content_type": stat.content_type,
+                "last_modified": stat.last_modified
+            }
+        except S3Error as e:
+            if e.code not in ("NoSuchKey", "NoSuchObject"):
+                print(f"Error reading object info from MinIO: {e}, trying local storage")
+            return local_storage_client.stat_file(object_name)
+    
+    def read_head(self, object_name: str, length: int) -> Optional[bytes]:
+        """First length bytes of an object, without downloading the rest"""
+        self._init_client()
+        if not self.client:
+            return local_storage_client.read_head(object_name, length)
+        try:
+            response = self.client.get_object(self.bucket_name, object_name, offset=0, length=length)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+        except S3Error as e:
+            print(f"Error reading file from MinIO: {e}, trying local storage")
+            return local_storage_client.read_head(object_name, length)
+    
     def download_file(self, object_name: str) -> Optional[bytes]:
         self._init_client()
         if not self.client:
@@ -78,6 +301,36 @@ class MinIOClient:
             print(f"Error downloading file from MinIO: {e}, trying local storage")
             return local_storage_client.download_file(object_name)
     
+    def iter_file(
+        self,
+        object_name: str,
+        chunk_size: Optional[int] = None,
+        offset: int = 0,
+        length: Optional[int] = None
+    ) -> Optional[ObjectStream]:
+        """Open an object, or a byte range of it, for reading in bounded chunks"""
+        self._init_client()
+        if not self.client:
+            return local_storage_client.iter_file(object_name, chunk_size, offset, length)
+        try:
+            response = self.client.get_object(
+                self.bucket_name,
+                object_name,
+                offset=offset,
+                length=length or 0
+            )
+        except S3Error as e:
+            print(f"Error opening file in MinIO: {e}, trying local storage")
+            return local_storage_client.iter_file(object_name, chunk_size, offset, length)
+        
+        size = response.headers.get("Content-Length")
+        return ObjectStream(
+            response,
+            int(size) if size else None,
+            chunk_size or settings.upload_chunk_size,
+            release=response.release_conn
+        )
+    
     def delete_file(self, object_name: str) -> bool:
         self._init_client()
         if not self.client:
@@ -89,17 +342,64 @@ class MinIOClient:
             print(f"Error deleting file from MinIO: {e}, trying local storage")
             return local_storage_client.delete_file(object_name)
     
-    def get_file_url(self, object_name: str, expires: int = 3600) -> Optional[str]:
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every object under prefix and return how many were removed"""
+        self._init_client()
+        if not self.client:
+            return local_storage_client.delete_prefix(prefix)
+        try:
+            removed = 0
+            for obj in self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True):
+                self.client.remove_object(self.bucket_name, obj.object_name)
+                removed += 1
+            return removed
+        except S3Error as e:
+            print(f"Error deleting prefix from MinIO: {e}, trying local storage")
+            return local_storage_client.delete_prefix(prefix)
+    
+    def uses_object_storage(self) -> bool:
+        """Whether MinIO is reachable, rather than the local fallback being active"""
+        self._init_client()
+        return self.client is not None
+    
+    def get_file_url(
+        self,
+        object_name: str,
+        expires: int = 3600,
+        response_headers: Optional[dict] = None
+    ) -> Optional[str]:
+        """Presigned GET URL valid for at least ``expires`` seconds.
+        
+        URLs are signed from the start of an aligned PRESIGNED_URL_WINDOW, so
+        every request in a window gets the same, cacheable URL and signing
+        happens once per object and window.
+        """
         self._init_client()
         if not self.client:
             return local_storage_client.get_file_url(object_name, expires)
+        
+        window = settings.presigned_url_window
+        now = int(time.time())
+        window_start = now - now % window
+        key = "|".join([
+            object_name,
+            str(expires),
+            str(window_start),
+            *sorted(f"{name}={value}" for name, value in (response_headers or {}).items())
+        ])
+        cached = presigned_url_cache.get(key)
+        if cached is not None:
+            return cached.decode()
+        
         try:
-            from datetime import timedelta
             url = self.client.presigned_get_object(
                 self.bucket_name,
                 object_name,
-                expires=timedelta(seconds=expires)
+                expires=timedelta(seconds=min(expires + window, MAX_PRESIGNED_EXPIRES)),
+                response_headers=response_headers,
+                request_date=datetime.fromtimestamp(window_start, timezone.utc)
             )
+            presigned_url_cache.set(key, url.encode())
             return url
         except S3Error as e:
             print(f"Error generating MinIO URL: {e}, using local storage URL")
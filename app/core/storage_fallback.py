@@ -1,10 +1,58 @@
 import os
 import io
-from typing import BinaryIO, Optional
+import hashlib
+import hmac
+import shutil
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import quote, urlencode
+from typing import BinaryIO, Iterator, List, Optional, Tuple
 from pathlib import Path
 from app.core.config import settings
 
 
+class ObjectStream:
+    """Chunked iterator over an open stored object.
+    
+    The underlying handle is released when iteration ends or on ``close()``,
+    which is idempotent so a response can also call it after a client disconnect.
+    """
+    
+    def __init__(self, handle, size: Optional[int], chunk_size: int, release=None):
+        self.size = size
+        self.chunk_size = chunk_size
+        self._handle = handle
+        self._release = release
+        self._closed = False
+    
+    def __iter__(self) -> Iterator[bytes]:
+        # Never read past size, so a local handle stops at the end of a byte range
+        remaining = self.size
+        try:
+            while not self._closed and remaining != 0:
+                amount = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+                chunk = self._handle.read(amount)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            self.close()
+    
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._handle.close()
+            if self._release:
+                self._release()
+        except Exception as e:
+            print(f"Error closing object stream: {e}")
+
+
 class LocalStorageClient:
     """Fallback local storage when MinIO is not available"""
     
@@ -25,7 +73,7 @@ class LocalStorageClient:
             
             with open(file_path, "wb") as f:
                 if hasattr(file_data, 'read'):
-                    f.write(file_data.read())
+                    shutil.copyfileobj(file_data, f, settings.upload_chunk_size)
                 else:
                     f.write(file_data)
             
@@ -35,6 +83,155 @@ class LocalStorageClient:
             print(f"Error saving file locally: {e}")
             return False
     
+    def upload_stream(
+        self,
+        file_data: BinaryIO,
+        object_name: str,
+        content_type: str
+    ) -> bool:
+        """Copy a stream to disk through a bounded buffer"""
+        try:
+            file_path = self.storage_path / object_name
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            with open(file_path, "wb") as f:
+                shutil.copyfileobj(file_data, f, settings.upload_chunk_size)
+            
+            print(f"File streamed locally: {file_path}")
+            return True
+        except Exception as e:
+            print(f"Error streaming file locally: {e}")
+            return False
+    
+    LOCAL_UPLOAD_PREFIX = "local-"
+    
+    def is_local_upload(self, upload_id: str) -> bool:
+        return upload_id.startswith(self.LOCAL_UPLOAD_PREFIX)
+    
+    def _parts_dir(self, upload_id: str) -> Path:
+        return self.storage_path / ".multipart" / upload_id
+    
+    def create_multipart_upload(self, object_name: str, content_type: str) -> Optional[str]:
+        try:
+            upload_id = f"{self.LOCAL_UPLOAD_PREFIX}{uuid.uuid4().hex}"
+            self._parts_dir(upload_id).mkdir(parents=True, exist_ok=True)
+            return upload_id
+        except Exception as e:
+            print(f"Error creating local multipart upload: {e}")
+            return None
+    
+    def upload_part(
+        self,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes
+    ) -> Optional[str]:
+        try:
+            part_path = self._parts_dir(upload_id) / f"{part_number:05d}"
+            with open(part_path, "wb") as f:
+                f.write(data)
+            return f"{upload_id}-{part_number}"
+        except Exception as e:
+            print(f"Error saving local part: {e}")
+            return None
+    
+    def complete_multipart_upload(
+        self,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]]
+    ) -> bool:
+        try:
+            parts_dir = self._parts_dir(upload_id)
+            file_path = self.storage_path / object_name
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            with open(file_path, "wb") as f:
+                for part_number, _ in sorted(parts):
+                    with open(parts_dir / f"{part_number:05d}", "rb") as part:
+                        shutil.copyfileobj(part, f, settings.upload_chunk_size)
+            
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            return True
+        except Exception as e:
+            print(f"Error completing local multipart upload: {e}")
+            return False
+    
+    def abort_multipart_upload(self, object_name: str, upload_id: str) -> bool:
+        shutil.rmtree(self._parts_dir(upload_id), ignore_errors=True)
+        return True
+    
+    def _sign_upload(
+        self,
+        object_name: str,
+        expires_at: int,
+        upload_id: Optional[str],
+        part_number: Optional[int]
+    ) -> str:
+        message = f"PUT\n{object_name}\n{expires_at}\n{upload_id or ''}\n{part_number or ''}"
+        return hmac.new(settings.jwt_secret_key.encode(), message.encode(), hashlib.sha256).hexdigest()
+    
+    def get_upload_url(
+        self,
+        object_name: str,
+        expires: int = 3600,
+        upload_id: Optional[str] = None,
+        part_number: Optional[int] = None
+    ) -> Optional[str]:
+        """Signed URL for the API's local PUT endpoint, the stand-in for a presigned URL"""
+        expires_at = int(time.time()) + expires
+        params = {"expires": expires_at}
+        if upload_id:
+            params["upload_id"] = upload_id
+            params["part_number"] = part_number
+        params["signature"] = self._sign_upload(object_name, expires_at, upload_id, part_number)
+        return f"/api/v1/files/storage/{quote(object_name)}?{urlencode(params)}"
+    
+    def verify_upload_signature(
+        self,
+        object_name: str,
+        expires_at: int,
+        signature: str,
+        upload_id: Optional[str] = None,
+        part_number: Optional[int] = None
+    ) -> bool:
+        if expires_at < time.time():
+            return False
+        expected = self._sign_upload(object_name, expires_at, upload_id, part_number)
+        return hmac.compare_digest(expected, signature)
+    
+    def local_path(self, object_name: str) -> Optional[Path]:
+        file_path = self.storage_path / object_name
+        return file_path if file_path.is_file() else None
+    
+    def stat_file(self, object_name: str) -> Optional[dict]:
+        try:
+            file_path = self.storage_path / object_name
+            if not file_path.is_file():
+                return None
+            stat = file_path.stat()
+            return {
+                "size": stat.st_size,
+                "etag": f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+                "content_type": None,
+                "last_modified": datetime.utcfromtimestamp(stat.st_mtime)
+            }
+        except Exception as e:
+            print(f"Error reading local file info: {e}")
+            return None
+    
+    def read_head(self, object_name: str, length: int) -> Optional[bytes]:
+        try:
+            file_path = self.storage_path / object_name
+            if file_path.exists():
+                with open(file_path, "rb") as f:
+                    return f.read(length)
+            return None
+        except Exception as e:
+            print(f"Error reading local file: {e}")
+            return None
+    
     def download_file(self, object_name: str) -> Optional[bytes]:
         try:
             file_path = self.storage_path / object_name
@@ -46,6 +243,24 @@ class LocalStorageClient:
             print(f"Error reading local file: {e}")
             return None
     
+    def iter_file(
+        self,
+        object_name: str,
+        chunk_size: Optional[int] = None,
+        offset: int = 0,
+        length: Optional[int] = None
+    ) -> Optional[ObjectStream]:
+        try:
+            handle = open(self.storage_path / object_name, "rb")
+        except OSError:
+            return None
+        
+        size = max(os.fstat(handle.fileno()).st_size - offset, 0)
+        if length is not None:
+            size = min(size, length)
+        handle.seek(offset)
+        return ObjectStream(handle, size, chunk_size or settings.upload_chunk_size)
+    
     def delete_file(self, object_name: str) -> bool:
         try:
             file_path = self.storage_path / object_name
@@ -57,6 +272,18 @@ class LocalStorageClient:
             print(f"Error deleting local file: {e}")
             return False
     
+    def delete_prefix(self, prefix: str) -> int:
+        try:
+            directory = self.storage_path / prefix
+            if not directory.is_dir():
+                return 0
+            removed = sum(1 for path in directory.rglob("*") if path.is_file())
+            shutil.rmtree(directory)
+            return removed
+        except Exception as e:
+            print(f"Error deleting local directory: {e}")
+            return 0
+    
     def get_file_url(self, object_name: str, expires: int = 3600) -> Optional[str]:
         # For local storage, return a basic file path
         # In production, you'd want to serve these through your web server
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+from app.core.config import settings
+from app.core.exceptions import FileSizeException, FileTypeException
+
+# Content kind -> magic byte checks, each an (offset, bytes) pair that must all match
+SIGNATURES: Tuple[Tuple[str, Tuple[Tuple[int, bytes], ...]], ...] = (
+    ("jpeg", ((0, b"\xff\xd8\xff"),)),
+    ("png", ((0, b"\x89PNG\r\n\x1a\n"),)),
+    ("gif", ((0, b"GIF87a"),)),
+    ("gif", ((0, b"GIF89a"),)),
+    ("webp", ((0, b"RIFF"), (8, b"WEBP"))),
+    ("bmp", ((0, b"BM"),)),
+    ("pdf", ((0, b"%PDF-"),)),
+    ("zip", ((0, b"PK\x03\x04"),)),
+    ("ole", ((0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),)),
+)
+
+# Content kinds each extension may contain
+EXTENSION_KINDS: Dict[str, FrozenSet[str]] = {
+    "jpg": frozenset({"jpeg"}),
+    "jpeg": frozenset({"jpeg"}),
+    "png": frozenset({"png"}),
+    "gif": frozenset({"gif"}),
+    "webp": frozenset({"webp"}),
+    "bmp": frozenset({"bmp"}),
+    "pdf": frozenset({"pdf"}),
+    "txt": frozenset({"text"}),
+    "csv": frozenset({"text"}),
+    "doc": frozenset({"ole"}),
+    "docx": frozenset({"zip"}),
+    "zip": frozenset({"zip"}),
+}
+
+# C0 control bytes that never appear in text; tab, newlines, form feed and escape do
+BINARY_BYTES = bytes(byte for byte in range(0x20) if byte not in b"\t\n\r\x0c\x1b")
+
+# Media type stored and served for each content kind
+KIND_MEDIA_TYPES: Dict[str, str] = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "bmp": "image/bmp",
+    "pdf": "application/pdf",
+    "text": "text/plain",
+    "ole": "application/msword",
+    "zip": "application/zip",
+}
+
+
+def get_extension(filename: Optional[str]) -> str:
+    return filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+
+
+@dataclass(frozen=True)
+class SniffResult:
+    kind: Optional[str]
+    content_type: str
+
+
+class UploadPolicy:
+    """Upload validation rules compiled once from settings.
+    
+    Metadata checks use frozen sets, and content checks sniff only the
+    first ``sniff_size`` bytes against signature tables indexed by first
+    byte, so mismatched content is rejected before it is fully read or
+    decoded.
+    """
+    
+    def __init__(self, max_file_size: int, allowed_extensions: Iterable[str], sniff_size: int = 4096):
+        self.max_file_size = max_file_size
+        self.allowed_extensions = frozenset(ext for ext in allowed_extensions if ext)
+        self.sniff_size = sniff_size
+        
+        signatures: Dict[int, list] = {}
+        for kind, checks in SIGNATURES:
+            offset, magic = checks[0]
+            signatures.setdefault(magic[0], []).append((kind, checks))
+        self._signatures = {first: tuple(entries) for first, entries in signatures.items()}
+    
+    @classmethod
+    def from_settings(cls) -> "UploadPolicy":
+        return cls(settings.max_file_size, settings.allowed_extensions_list)
+    
+    def check_metadata(self, filename: Optional[str], size: Optional[int]) -> tuple[bool, str]:
+        # Check file size
+        if size and size > self.max_file_size:
+            return False, f"File size exceeds maximum allowed size of {self.max_file_size} bytes"
+        
+        # Check file extension
+        extension = get_extension(filename)
+        if extension and extension not in self.allowed_extensions:
+            return False, f"File type .{extension} is not allowed"
+        
+        return True, "Valid"
+    
+    def sniff(self, head: bytes) -> Optional[str]:
+        """Content kind of a file from its first bytes, or None if unrecognized"""
+        if not head:
+            # An empty file is empty text
+            return "text"
+        for kind, checks in self._signatures.get(head[0], ()):
+            if all(head[offset:offset + len(magic)] == magic for offset, magic in checks):
+                return kind
+        if self._is_text(head):
+            return "text"
+        return None
+    
+    @staticmethod
+    def _is_text(head: bytes) -> bool:
+        # Any 8-bit encoding (UTF-8, Latin-1, Windows-1252) counts, binary formats
+        # give themselves away with NUL and other C0 control bytes
+        return len(head.translate(None, BINARY_BYTES)) == len(head)
+    
+    def check_content(self, filename: Optional[str], head: bytes) -> SniffResult:
+        """Match sniffed content against the extension, raising FileTypeException on mismatch.
+        
+        The media type comes from the sniffed content only; the one declared
+        by the client is never trusted, so content that is not recognized is
+        stored as application/octet-stream.
+        """
+        kind = self.sniff(head)
+        extension = get_extension(filename)
+        expected = EXTENSION_KINDS.get(extension)
+        if expected is not None and kind not in expected:
+            raise FileTypeException(
+                sorted(self.allowed_extensions),
+                detail=f"File content does not match its .{extension} extension"
+            )
+        if kind is None:
+            return SniffResult(kind=None, content_type="application/octet-stream")
+        return SniffResult(kind=kind, content_type=KIND_MEDIA_TYPES[kind])
+    
+    def check_size(self, size: int) -> None:
+        if size > self.max_file_size:
+            raise FileSizeException(self.max_file_size)
+
+
+# Global policy, built once at import
+upload_policy = UploadPolicy.from_settings()
@@ -1,14 +1,18 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
 
 from app.api import auth, users, files
 from app.core.database import engine, Base
 from app.core.config import settings
+from app.core.image_pool import image_pool
 from app.core.rate_limit import add_rate_limiting, limiter
+from app.core.request_limits import add_request_size_limit
 from app.core.error_handlers import add_error_handlers
 from app.core.logging_config import setup_logging
+from app.workers import download_counts
 import logging
 
 
@@ -19,9 +23,13 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Auth & File Upload API")
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created/verified")
+    flusher = asyncio.create_task(download_counts.run_flusher(settings.download_count_flush_interval))
     yield
     # Shutdown
     logger.info("Shutting down Auth & File Upload API")
+    flusher.cancel()
+    await asyncio.gather(flusher, return_exceptions=True)
+    image_pool.shutdown()
 
 
 app = FastAPI(
@@ -48,6 +56,9 @@ app.add_middleware(
 # Add rate limiting
 add_rate_limiting(app)
 
+# Reject oversized bodies before they are read
+add_request_size_limit(app)
+
 # Add error handlers
 add_error_handlers(app)
 
@@ -1,4 +1,6 @@
 from app.models.user import User
 from app.models.file import File
+from app.models.blob import Blob
+from app.models.counter_flush import CounterFlush
 
-__all__ = ["User", "File"]
\ No newline at end of file
+__all__ = ["User", "File", "Blob", "CounterFlush"]
\ No newline at end of file
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+
+class Blob(Base):
+    """Stored object shared by every file uploaded with the same content"""
+    __tablename__ = "blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 of the uploaded bytes
+    object_path = Column(String, nullable=False)  # MinIO object path
+    file_size = Column(Float, nullable=False)  # Stored size in bytes
+    ref_count = Column(Integer, default=1, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    files = relationship("File", back_populates="blob")
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+from app.core.database import Base
+
+
+class CounterFlush(Base):
+    """Last Redis counter batch applied to the database, one row per counter.
+    
+    Written in the same transaction as the counts, so a batch that was
+    applied but not yet cleared from Redis is recognized and not applied again.
+    """
+    __tablename__ = "counter_flushes"
+    
+    name = Column(String, primary_key=True)
+    batch_id = Column(String(32), nullable=False)
+    flushed_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -20,6 +20,9 @@ class File(Base):
     width = Column(Integer, nullable=True)
     height = Column(Integer, nullable=True)
     thumbnail_path = Column(String, nullable=True)
+    renditions = Column(JSON, nullable=True)  # rendition name -> MinIO object path
+    processing_status = Column(String, default="ready")  # pending, processing, ready, failed
+    content_updated_at = Column(DateTime, nullable=True)  # Set when processing replaced the stored content
     
     # Metadata
     description = Column(Text, nullable=True)
@@ -32,6 +35,8 @@ class File(Base):
     
     # Foreign Keys
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=True, index=True)
     
     # Relationships
-    owner = relationship("User", back_populates="files")
\ No newline at end of file
+    owner = relationship("User", back_populates="files")
+    blob = relationship("Blob", back_populates="files")
\ No newline at end of file
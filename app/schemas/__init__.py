@@ -5,7 +5,10 @@ from app.schemas.auth import (
     PasswordChange
 )
 from app.schemas.file import (
-    File, FileUpload, FileUpdate, FileList, FileUploadResponse
+    File, FileUpload, FileUpdate, FileList, FileUploadResponse,
+    FileUploadResult, UploadSessionCreate, UploadSessionStatus,
+    DirectUploadCreate, DirectUploadStatus, DirectUploadComplete,
+    FileArchiveRequest
 )
 
 __all__ = [
@@ -16,5 +19,8 @@ __all__ = [
     "RefreshTokenRequest", "PasswordResetRequest", "PasswordResetConfirm",
     "PasswordChange",
     # File schemas
-    "File", "FileUpload", "FileUpdate", "FileList", "FileUploadResponse"
+    "File", "FileUpload", "FileUpdate", "FileList", "FileUploadResponse",
+    "FileUploadResult", "UploadSessionCreate", "UploadSessionStatus",
+    "DirectUploadCreate", "DirectUploadStatus", "DirectUploadComplete",
+    "FileArchiveRequest"
 ]
\ No newline at end of file
@@ -1,6 +1,15 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, ConfigDict, computed_field
+from app.utils.image import ImageProcessor
+
+
+def rendition_urls(file_id: int) -> Dict[str, str]:
+    """API URLs of an image's renditions; they work on every storage backend and check access"""
+    return {
+        name: f"/api/v1/files/{file_id}/renditions/{name}"
+        for name in ImageProcessor.RENDITION_NAMES
+    }
 
 
 class FileBase(BaseModel):
@@ -30,6 +39,8 @@ class FileInDBBase(FileBase):
     width: Optional[int]
     height: Optional[int]
     thumbnail_path: Optional[str]
+    renditions: Optional[Dict[str, str]] = None
+    processing_status: Optional[str] = "ready"
     
     download_count: int
     user_id: int
@@ -40,7 +51,10 @@ class FileInDBBase(FileBase):
 
 
 class File(FileInDBBase):
-    pass
+    @computed_field
+    @property
+    def rendition_urls(self) -> Dict[str, str]:
+        return rendition_urls(self.id) if self.is_image else {}
 
 
 class FileList(BaseModel):
@@ -58,4 +72,66 @@ class FileUploadResponse(BaseModel):
     content_type: str
     download_url: str
     thumbnail_url: Optional[str] = None
-    created_at: datetime
\ No newline at end of file
+    rendition_urls: Dict[str, str] = Field(default_factory=dict)
+    processing_status: str = "ready"
+    created_at: datetime
+
+
+class FileUploadResult(BaseModel):
+    """Outcome of one file in a batch upload"""
+    filename: Optional[str] = None
+    success: bool
+    file: Optional[FileUploadResponse] = None
+    error: Optional[str] = None
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: str = "application/octet-stream"
+    file_size: int = Field(..., gt=0)
+    description: Optional[str] = None
+    is_public: bool = False
+
+
+class UploadSessionStatus(BaseModel):
+    id: str
+    filename: str
+    file_size: int
+    offset: int
+    chunk_size: int
+    expires_at: datetime
+
+
+class DirectUploadCreate(UploadSessionCreate):
+    pass
+
+
+class DirectUploadPart(BaseModel):
+    part_number: int
+    url: str
+
+
+class DirectUploadStatus(BaseModel):
+    id: str
+    filename: str
+    file_size: int
+    upload_url: Optional[str] = None  # single PUT for files up to part_size
+    part_size: Optional[int] = None
+    parts: List[DirectUploadPart] = Field(default_factory=list)
+    expires_at: datetime
+
+
+class CompletedPart(BaseModel):
+    part_number: int = Field(..., ge=1)
+    etag: str
+
+
+class DirectUploadComplete(BaseModel):
+    parts: List[CompletedPart] = Field(default_factory=list)
+
+
+class FileArchiveRequest(BaseModel):
+    """Files to bundle: explicit ids, or the caller's own files filtered by type"""
+    file_ids: Optional[List[int]] = Field(None, min_length=1)
+    content_type: Optional[str] = None  # prefix such as "image/"
+    filename: str = Field("files.zip", max_length=255)
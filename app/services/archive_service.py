@@ -0,0 +1,210 @@
+import asyncio
+import io
+import mimetypes
+import zipfile
+from datetime import datetime
+from functools import partial
+from pathlib import PurePosixPath
+from typing import List, Optional, Tuple
+from fastapi import UploadFile
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from app.core.config import settings
+from app.core.exceptions import FileSizeException
+from app.core.storage import storage_client
+from app.core.validation import upload_policy
+from app.models.file import File
+from app.models.user import User
+from app.services.file_service import FileService, PreparedUpload
+from app.utils.stream import ZipEntry, ZipStream
+
+
+class ArchiveService:
+    """Bulk uploads from, and bulk downloads as, zip archives.
+    
+    Uploaded entries are decompressed one at a time from the spooled archive into
+    memory, never extracted to disk, and go through the regular upload
+    pipeline. Zip bombs are refused up front from the central directory
+    (entry count, declared expansion) and per entry (size and compression
+    ratio); zipfile's CRC check catches entries whose headers lie.
+    Downloads are zipped on the fly from storage, one object at a time.
+    """
+    
+    # Already-compressed formats gain nothing from deflate
+    STORED_CONTENT_TYPES = frozenset({
+        "image/jpeg", "image/png", "image/gif", "image/webp", "image/avif",
+        "application/zip", "application/gzip", "application/x-7z-compressed",
+        "application/pdf",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    })
+    
+    @staticmethod
+    def _entry_name(info: zipfile.ZipInfo) -> str:
+        return PurePosixPath(info.filename).name
+    
+    @staticmethod
+    def list_entries(archive: zipfile.ZipFile, archive_size: int) -> List[zipfile.ZipInfo]:
+        """Files in the archive, raising ValueError if it exceeds the archive limits"""
+        entries = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and not ArchiveService._entry_name(info).startswith(".")
+        ]
+        
+        if len(entries) > settings.max_archive_entries:
+            raise ValueError(f"Archive contains more than {settings.max_archive_entries} files")
+        
+        expanded_size = sum(info.file_size for info in entries)
+        if expanded_size > archive_size * settings.max_archive_ratio:
+            raise ValueError(f"Archive expands to more than {settings.max_archive_ratio} times its size")
+        
+        return entries
+    
+    @staticmethod
+    def read_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> UploadFile:
+        """Decompress one entry into an in-memory upload, enforcing the per-entry limits"""
+        if info.flag_bits & 0x1:
+            raise ValueError("Encrypted archive entries are not supported")
+        if info.file_size > settings.max_file_size:
+            raise FileSizeException(settings.max_file_size)
+        if info.compress_size and info.file_size / info.compress_size > settings.max_archive_ratio:
+            raise ValueError(f"Compression ratio exceeds {settings.max_archive_ratio}")
+        
+        try:
+            # Reads stop at the declared size and fail the CRC check if it was a lie
+            with archive.open(info) as entry:
+                data = entry.read(settings.max_file_size + 1)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError) as e:
+            raise ValueError(f"Corrupt archive entry: {e}")
+        
+        filename = ArchiveService._entry_name(info)
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return UploadFile(
+            file=io.BytesIO(data),
+            size=len(data),
+            filename=filename,
+            headers=Headers({"content-type": content_type})
+        )
+    
+    @staticmethod
+    async def upload_archive(
+        db: Session,
+        archive_file: UploadFile,
+        user: User,
+        is_public: bool = False
+    ) -> List[Tuple[str, Optional[File], Optional[str]]]:
+        """Ingest every file in a zip archive and return (entry name, file, error) per entry"""
+        archive_file.file.seek(0, 2)
+        archive_size = archive_file.file.tell()
+        if archive_size > settings.max_archive_size:
+            raise FileSizeException(settings.max_archive_size)
+        
+        archive_file.file.seek(0)
+        if upload_policy.sniff(archive_file.file.read(upload_policy.sniff_size)) != "zip":
+            raise ValueError("Upload is not a zip archive")
+        archive_file.file.seek(0)
+        
+        try:
+            archive = zipfile.ZipFile(archive_file.file)
+        except zipfile.BadZipFile:
+            raise ValueError("Invalid zip archive")
+        
+        with archive:
+            entries = ArchiveService.list_entries(archive, archive_size)
+            semaphore = asyncio.Semaphore(settings.upload_batch_concurrency)
+            
+            # Entries are decompressed only when a slot frees up, so at most
+            # upload_batch_concurrency of them are in memory at once
+            async def ingest(info: zipfile.ZipInfo) -> PreparedUpload:
+                async with semaphore:
+                    entry_file = await run_in_threadpool(ArchiveService.read_entry, archive, info)
+                    return await FileService.prepare_upload(db, entry_file, user)
+            
+            outcomes = await asyncio.gather(
+                *(ingest(info) for info in entries),
+                return_exceptions=True
+            )
+        
+        # Entries are closed with the archive, so a removed blob can't be re-stored here
+        results = await FileService.save_batch(db, user, outcomes, is_public)
+        return [
+            (info.filename, db_file, error)
+            for info, (db_file, error) in zip(entries, results)
+        ]
+    
+    @staticmethod
+    def get_archive_files(
+        db: Session,
+        user: Optional[User],
+        file_ids: Optional[List[int]] = None,
+        content_type: Optional[str] = None
+    ) -> List[File]:
+        """Files to bundle, fetched and permission-checked in a single query.
+        
+        Explicit ids may name the caller's files and any public file; without
+        ids the caller's own files are used. Raises ValueError if an id is
+        missing or not accessible, or if the set exceeds the archive limit.
+        """
+        query = db.query(File)
+        if file_ids:
+            access = File.is_public == True
+            if user:
+                access = or_(access, File.user_id == user.id)
+            query = query.filter(File.id.in_(set(file_ids)), access)
+        elif user:
+            query = query.filter(File.user_id == user.id)
+        else:
+            raise ValueError("Select files by id or sign in to archive your own")
+        
+        if content_type:
+            query = query.filter(File.content_type.startswith(content_type))
+        
+        files = query.order_by(File.id).limit(settings.max_archive_entries + 1).all()
+        if len(files) > settings.max_archive_entries:
+            raise ValueError(f"Archives are limited to {settings.max_archive_entries} files")
+        
+        if file_ids:
+            missing = set(file_ids) - {file.id for file in files}
+            if missing:
+                raise ValueError(f"Files not found: {', '.join(map(str, sorted(missing)))}")
+        if not files:
+            raise ValueError("No files to archive")
+        return files
+    
+    @staticmethod
+    def _archive_names(files: List[File]) -> List[str]:
+        """Original filenames, made unique with a numeric suffix"""
+        names = []
+        taken = set()
+        for file in files:
+            name = PurePosixPath(file.original_filename.replace("\\", "/")).name or file.filename
+            stem, suffix = PurePosixPath(name).stem, PurePosixPath(name).suffix
+            counter = 1
+            while name.lower() in taken:
+                name = f"{stem} ({counter}){suffix}"
+                counter += 1
+            taken.add(name.lower())
+            names.append(name)
+        return names
+    
+    @staticmethod
+    def zip_stream(files: List[File]) -> ZipStream:
+        entries = []
+        for file, name in zip(files, ArchiveService._archive_names(files)):
+            created = file.created_at or datetime.utcnow()
+            entries.append(ZipEntry(
+                name=name,
+                date_time=created.timetuple()[:6],
+                compress_type=(
+                    zipfile.ZIP_STORED
+                    if file.content_type in ArchiveService.STORED_CONTENT_TYPES
+                    else zipfile.ZIP_DEFLATED
+                ),
+                open=partial(storage_client.iter_file, file.file_path)
+            ))
+        return ZipStream(entries)
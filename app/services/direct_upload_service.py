@@ -0,0 +1,185 @@
+import io
+import math
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.core.storage import storage_client
+from app.core.storage_fallback import local_storage_client
+from app.core.validation import upload_policy
+from app.models.file import File
+from app.models.user import User
+from app.schemas.file import DirectUploadCreate
+from app.services.file_service import FileService
+
+
+class DirectUploadService:
+    """Uploads that go from the client straight to storage through presigned URLs.
+    
+    Files up to ``upload_part_size`` get a single presigned PUT; larger ones a
+    multipart upload with one presigned URL per part. The API only sees the
+    metadata, and verifies the stored object when the client completes.
+    """
+    
+    @staticmethod
+    def _key(upload_id: str) -> str:
+        return f"direct_upload:{upload_id}"
+    
+    @staticmethod
+    def create_upload(user: User, upload_data: DirectUploadCreate) -> dict:
+        upload_policy.check_size(upload_data.file_size)
+        is_valid, message = FileService.validate_metadata(
+            upload_data.filename, upload_data.file_size
+        )
+        if not is_valid:
+            raise ValueError(message)
+        
+        unique_filename = FileService.generate_unique_filename(upload_data.filename)
+        object_path = f"uploads/{user.id}/{unique_filename}"
+        expires = settings.direct_upload_expires
+        
+        multipart_id = None
+        part_urls = []
+        upload_url = None
+        if upload_data.file_size > settings.upload_part_size:
+            multipart_id = storage_client.create_multipart_upload(object_path, upload_data.content_type)
+            if not multipart_id:
+                raise ValueError("Failed to start upload in storage")
+            part_count = math.ceil(upload_data.file_size / settings.upload_part_size)
+            for part_number in range(1, part_count + 1):
+                url = storage_client.get_upload_url(object_path, expires, multipart_id, part_number)
+                if not url:
+                    storage_client.abort_multipart_upload(object_path, multipart_id)
+                    raise ValueError("Failed to sign upload URLs")
+                part_urls.append([part_number, url])
+        else:
+            upload_url = storage_client.get_upload_url(object_path, expires)
+            if not upload_url:
+                raise ValueError("Failed to sign upload URL")
+        
+        upload = {
+            "id": uuid.uuid4().hex,
+            "user_id": user.id,
+            "object_path": object_path,
+            "unique_filename": unique_filename,
+            "multipart_id": multipart_id,
+            "upload_url": upload_url,
+            "part_urls": part_urls,
+            "filename": upload_data.filename,
+            "content_type": upload_data.content_type,
+            "file_size": upload_data.file_size,
+            "description": upload_data.description,
+            "is_public": upload_data.is_public,
+            "expires_at": (datetime.utcnow() + timedelta(seconds=expires)).isoformat()
+        }
+        
+        if not redis_client.set(DirectUploadService._key(upload["id"]), upload, expires):
+            if multipart_id:
+                storage_client.abort_multipart_upload(object_path, multipart_id)
+            raise ValueError("Failed to create upload")
+        
+        return upload
+    
+    @staticmethod
+    def get_upload(upload_id: str) -> Optional[dict]:
+        upload = redis_client.get(DirectUploadService._key(upload_id))
+        return upload if isinstance(upload, dict) else None
+    
+    @staticmethod
+    def _verify_object(upload: dict) -> str:
+        """Check the stored object against the upload and return its sniffed content type"""
+        stat = storage_client.stat_file(upload["object_path"])
+        if not stat:
+            raise ValueError("Uploaded object not found in storage")
+        
+        try:
+            upload_policy.check_size(stat["size"])
+            if stat["size"] != upload["file_size"]:
+                raise ValueError(
+                    f"Uploaded object is {stat['size']} bytes, expected {upload['file_size']}"
+                )
+            
+            head = storage_client.read_head(upload["object_path"], upload_policy.sniff_size) or b""
+            return upload_policy.check_content(upload["filename"], head).content_type
+        except Exception:
+            # Don't keep objects that will never get a file row
+            storage_client.delete_file(upload["object_path"])
+            raise
+    
+    @staticmethod
+    async def complete_upload(
+        db: Session,
+        upload: dict,
+        user: User,
+        parts: Optional[List[Tuple[int, str]]] = None
+    ) -> File:
+        key = DirectUploadService._key(upload["id"])
+        if upload["multipart_id"]:
+            expected = len(upload["part_urls"])
+            if not parts or sorted(part_number for part_number, _ in parts) != list(range(1, expected + 1)):
+                raise ValueError(f"ETags for all {expected} parts are required")
+            if not await run_in_threadpool(
+                storage_client.complete_multipart_upload,
+                upload["object_path"],
+                upload["multipart_id"],
+                parts
+            ):
+                raise ValueError("Failed to assemble upload in storage")
+            # A retry after a failed finalize must not assemble the parts again
+            upload["multipart_id"] = None
+            redis_client.set(key, upload, settings.direct_upload_expires)
+        
+        try:
+            content_type = await run_in_threadpool(DirectUploadService._verify_object, upload)
+        except Exception:
+            # The object is gone, so the upload can't be completed anymore
+            redis_client.delete(key)
+            raise
+        
+        # Hashing for deduplication would pull every object through the API
+        db_file = await FileService.finalize_stored_upload(
+            db,
+            user,
+            unique_filename=upload["unique_filename"],
+            original_filename=upload["filename"],
+            object_path=upload["object_path"],
+            content_type=content_type,
+            file_size=upload["file_size"],
+            description=upload["description"],
+            is_public=upload["is_public"],
+            deduplicate=False
+        )
+        redis_client.delete(key)
+        return db_file
+    
+    @staticmethod
+    def abort_upload(upload: dict) -> bool:
+        if upload["multipart_id"]:
+            storage_client.abort_multipart_upload(upload["object_path"], upload["multipart_id"])
+        else:
+            storage_client.delete_file(upload["object_path"])
+        return redis_client.delete(DirectUploadService._key(upload["id"]))
+    
+    @staticmethod
+    def store_local_upload(
+        object_name: str,
+        data: bytes,
+        upload_id: Optional[str] = None,
+        part_number: Optional[int] = None
+    ) -> Optional[str]:
+        """Target of the local storage fallback's signed URLs; returns the ETag"""
+        if upload_id:
+            return local_storage_client.upload_part(object_name, upload_id, part_number, data)
+        
+        if not local_storage_client.upload_file(
+            io.BytesIO(data),
+            object_name,
+            "application/octet-stream",
+            len(data)
+        ):
+            return None
+        stat = local_storage_client.stat_file(object_name)
+        return stat["etag"] if stat else None
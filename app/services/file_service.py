@@ -1,15 +1,56 @@
+import asyncio
+import hashlib
 import io
 import uuid
-from typing import Optional, List, BinaryIO
+from dataclasses import dataclass
+from typing import Dict, Optional, List, BinaryIO, Tuple
 from datetime import datetime
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import object_cache
 from app.core.config import settings
+from app.core.validation import SniffResult, upload_policy
+from app.core.image_pool import image_pool
+from app.core.redis import redis_client
 from app.core.storage import storage_client
+from app.models.blob import Blob
+from app.models.counter_flush import CounterFlush
 from app.models.file import File
 from app.models.user import User
-from app.schemas.file import FileUpload, FileUpdate
-from app.utils.image import ImageProcessor
+from app.schemas.file import FileUpload, FileUpdate, rendition_urls
+from app.services.image_service import ImageService
+from app.utils.image import ImageProcessor, ProcessedImage
+from app.utils.stream import CountingReader, sha256_chunks, sha256_stream
+
+DERIVATIVE_QUEUE = "derivatives"
+DOWNLOAD_COUNTER = "downloads"
+
+# Derived from the stored content, so identical for every file sharing a blob
+SHARED_IMAGE_FIELDS = (
+    "width", "height", "thumbnail_path", "renditions", "processing_status", "content_updated_at"
+)
+
+
+@dataclass
+class PreparedUpload:
+    """An upload whose content is in storage and is waiting for its database row"""
+    unique_filename: str
+    original_filename: str
+    content_type: str
+    object_path: str
+    file_size: int
+    is_image: bool
+    content_hash: Optional[str] = None
+    blob_id: Optional[int] = None  # Existing blob when the content was already stored
+    width: Optional[int] = None
+    height: Optional[int] = None
+    renditions: Optional[Dict[str, str]] = None
+    processing_status: str = "ready"
+    content_updated_at: Optional[datetime] = None
 
 
 class FileService:
@@ -20,108 +61,636 @@ class FileService:
         extension = original_filename.rsplit('.', 1)[-1] if '.' in original_filename else ''
         return f"{timestamp}_{unique_id}.{extension}" if extension else f"{timestamp}_{unique_id}"
     
+    @staticmethod
+    def validate_metadata(filename: Optional[str], size: Optional[int]) -> tuple[bool, str]:
+        return upload_policy.check_metadata(filename, size)
+    
     @staticmethod
     def validate_file(file: UploadFile) -> tuple[bool, str]:
-        # Check file size
-        if file.size and file.size > settings.max_file_size:
-            return False, f"File size exceeds maximum allowed size of {settings.max_file_size} bytes"
+        size = file.size
+        if size is None:
+            # Not reported by the parser, measure the spooled file instead
+            position = file.file.tell()
+            size = file.file.seek(0, 2)
+            file.file.seek(position)
+        upload_policy.check_size(size)
+        return FileService.validate_metadata(file.filename, size)
+    
+    @staticmethod
+    def sniff_file(file: UploadFile) -> SniffResult:
+        """Check the first bytes of the spooled upload against its extension"""
+        position = file.file.tell()
+        file.file.seek(0)
+        head = file.file.read(upload_policy.sniff_size)
+        file.file.seek(position)
+        return upload_policy.check_content(file.filename, head)
+    
+    @staticmethod
+    def blob_object_path(content_hash: str) -> str:
+        return f"blobs/{content_hash[:2]}/{content_hash}"
+    
+    @staticmethod
+    def get_blob(db: Session, content_hash: str) -> Optional[Blob]:
+        return db.query(Blob).filter(Blob.content_hash == content_hash).first()
+    
+    @staticmethod
+    def _add_blob_reference(db: Session, blob_id: int, delta: int, content_hash: Optional[str] = None) -> bool:
+        """Atomically adjust a blob's reference count; False if the blob no longer exists.
         
-        # Check file extension
-        if file.filename:
-            extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
-            if extension and extension not in settings.allowed_extensions_list:
-                return False, f"File type .{extension} is not allowed"
+        With a content hash, a blob that was deleted and whose id was reused
+        for other content counts as gone too.
+        """
+        query = db.query(Blob).filter(Blob.id == blob_id)
+        if content_hash is not None:
+            query = query.filter(Blob.content_hash == content_hash)
+        updated = query.update(
+            {Blob.ref_count: Blob.ref_count + delta},
+            synchronize_session=False
+        )
+        return updated == 1
+    
+    @staticmethod
+    def _blob_files(db: Session, file: File) -> List[File]:
+        if file.blob_id is None:
+            return [file]
+        return db.query(File).filter(File.blob_id == file.blob_id).all()
+    
+    @staticmethod
+    def rendition_object_path(name: str, key: str) -> str:
+        if name == "thumbnail":
+            return f"thumbnails/thumb_{key}"
+        return f"renditions/{name}/{key}"
+    
+    @staticmethod
+    def _store_derivatives(processed: ProcessedImage, key: str) -> Dict[str, str]:
+        """Upload the derived images and return their object paths by rendition name"""
+        renditions = {}
+        for name, data in processed.thumbnails.items():
+            object_path = FileService.rendition_object_path(name, key)
+            if storage_client.upload_file(
+                io.BytesIO(data),
+                object_path,
+                "image/jpeg",
+                len(data)
+            ):
+                renditions[name] = object_path
+        return renditions
+    
+    @staticmethod
+    async def _process_image(
+        file_data: bytes,
+        object_path: str,
+        content_type: str,
+        rendition_key: str
+    ) -> Optional[tuple[int, Optional[int], Optional[int], Optional[Dict[str, str]]]]:
+        """Store the optimized image with its renditions and return size, width, height and rendition paths.
+        
+        All objects are written concurrently; if any write fails none of them
+        is kept and None is returned.
+        """
+        # Decode once in the image pool and derive every output from it
+        processed = await image_pool.run(
+            ImageProcessor.process_image,
+            file_data,
+            None,
+            settings.image_resize_quality
+        )
+        if not processed:
+            stored = await storage_client.upload_objects([(object_path, file_data, content_type)])
+            return (len(file_data), None, None, None) if stored else None
         
-        return True, "Valid"
+        renditions = {
+            name: FileService.rendition_object_path(name, rendition_key)
+            for name in processed.thumbnails
+        }
+        objects = [(object_path, processed.optimized, content_type)] + [
+            (renditions[name], data, "image/jpeg")
+            for name, data in processed.thumbnails.items()
+        ]
+        if not await storage_client.upload_objects(objects):
+            return None
+        return len(processed.optimized), processed.width, processed.height, renditions
     
     @staticmethod
-    async def upload_file(
+    def _queue_derivatives(is_image: bool) -> bool:
+        return is_image and settings.derivative_mode == "queue"
+    
+    @staticmethod
+    def schedule_derivatives(file: File) -> bool:
+        """Hand image processing to the derivative workers"""
+        queued = redis_client.enqueue(DERIVATIVE_QUEUE, {"file_id": file.id})
+        if not queued:
+            # Stays pending; `python -m app.workers.derivatives --requeue-pending` picks it up
+            print(f"Failed to queue derivatives for file {file.id}")
+        return queued
+    
+    @staticmethod
+    def _copy_shared_fields(target: File, source: File) -> None:
+        for field in SHARED_IMAGE_FIELDS + ("file_size", "file_path"):
+            setattr(target, field, getattr(source, field))
+    
+    @staticmethod
+    def generate_derivatives(db: Session, file: File) -> Optional[bool]:
+        """Worker side of the derivative queue: optimize the stored original and add renditions.
+        
+        Results are written to every file sharing the blob, so a duplicate
+        upload queued while its blob is pending needs no work of its own.
+        Returns None while another worker holds the blob; the job should be
+        retried later, when it finds the results and copies them.
+        """
+        shared = FileService._blob_files(db, file)
+        ready = next((other for other in shared if other.processing_status == "ready"), None)
+        if ready:
+            FileService._copy_shared_fields(file, ready)
+            db.commit()
+            return True
+        
+        lock_key = f"derivatives:blob:{file.blob_id}" if file.blob_id else f"derivatives:file:{file.id}"
+        lock = redis_client.acquire_lock(lock_key, expire=int(settings.image_queue_timeout * 10))
+        if not lock:
+            return None
+        
+        try:
+            file.processing_status = "processing"
+            db.commit()
+            
+            file_data = storage_client.download_file(file.file_path)
+            processed = ImageProcessor.process_image(
+                file_data, None, settings.image_resize_quality
+            ) if file_data else None
+            
+            if not processed:
+                file.processing_status = "failed"
+                db.commit()
+                return False
+            
+            rendition_key = file.blob.content_hash if file.blob else file.filename
+            renditions = FileService._store_derivatives(processed, rendition_key)
+            
+            # The optimized image goes to a new object so that downloads of the
+            # original keep working, and keep their validators, until the swap
+            # below is committed
+            original_path = object_path = file.file_path
+            file_size = file.file_size
+            content_updated_at = file.content_updated_at
+            optimized_path = FileService.rendition_object_path("optimized", rendition_key)
+            if storage_client.upload_file(
+                io.BytesIO(processed.optimized),
+                optimized_path,
+                file.content_type,
+                len(processed.optimized)
+            ):
+                object_path = optimized_path
+                file_size = len(processed.optimized)
+                content_updated_at = datetime.utcnow()
+                if file.blob:
+                    file.blob.object_path = object_path
+                    file.blob.file_size = file_size
+            
+            # Pick up duplicates uploaded while this file was processing
+            for target in FileService._blob_files(db, file):
+                target.renditions = renditions
+                target.thumbnail_path = renditions.get("thumbnail")
+                target.file_path = object_path
+                target.file_size = file_size
+                target.content_updated_at = content_updated_at
+                target.width = processed.width
+                target.height = processed.height
+                target.processing_status = "ready"
+            db.commit()
+            
+            if object_path != original_path:
+                # Duplicates inserted after the query above still point at the original
+                late = db.query(File).filter(File.file_path == original_path).all()
+                for target in late:
+                    FileService._copy_shared_fields(target, file)
+                db.commit()
+                if db.query(File).filter(File.file_path == original_path).first():
+                    return True
+                
+                # Caches are keyed by object path, so only the original's entries go stale
+                original = File(file_path=original_path)
+                object_cache.delete_prefix(FileService._object_cache_prefix(original))
+                ImageService.delete_derivatives(original)
+                storage_client.delete_file(original_path)
+            return True
+        finally:
+            redis_client.release_lock(lock_key, lock)
+    
+    @staticmethod
+    def _prepare_duplicate(
         db: Session,
-        file: UploadFile,
+        content_hash: str,
+        unique_filename: str,
+        original_filename: str,
+        content_type: str
+    ) -> Optional[PreparedUpload]:
+        """Point an upload at already stored content, or None if there is none"""
+        blob = FileService.get_blob(db, content_hash)
+        if not blob:
+            return None
+        
+        is_image = ImageProcessor.is_image(content_type)
+        source = db.query(File).filter(File.blob_id == blob.id).first() if is_image else None
+        shared = {field: getattr(source, field) for field in SHARED_IMAGE_FIELDS} if source else {}
+        processing_status = shared.get("processing_status") or "ready"
+        if processing_status == "processing":
+            # Gets its own job, which copies the results once they are ready
+            processing_status = "pending"
+        
+        return PreparedUpload(
+            unique_filename=unique_filename,
+            original_filename=original_filename,
+            content_type=content_type,
+            object_path=blob.object_path,
+            file_size=blob.file_size,
+            is_image=is_image,
+            content_hash=content_hash,
+            blob_id=blob.id,
+            width=shared.get("width"),
+            height=shared.get("height"),
+            renditions=shared.get("renditions"),
+            processing_status=processing_status,
+            content_updated_at=shared.get("content_updated_at")
+        )
+    
+    @staticmethod
+    def _new_file_record(
         user: User,
-        description: Optional[str] = None,
-        is_public: bool = False
+        prepared: PreparedUpload,
+        description: Optional[str],
+        is_public: bool
+    ) -> File:
+        """Build the file row, registering a new blob unless the content is already stored"""
+        original_filename = prepared.original_filename
+        db_file = File(
+            filename=prepared.unique_filename,
+            original_filename=original_filename,
+            file_path=prepared.object_path,
+            file_size=prepared.file_size,
+            content_type=prepared.content_type,
+            file_extension=original_filename.rsplit('.', 1)[-1] if '.' in original_filename else None,
+            is_image=prepared.is_image,
+            width=prepared.width,
+            height=prepared.height,
+            thumbnail_path=prepared.renditions.get("thumbnail") if prepared.renditions else None,
+            renditions=prepared.renditions,
+            processing_status=prepared.processing_status,
+            content_updated_at=prepared.content_updated_at,
+            description=description,
+            is_public=is_public,
+            user_id=user.id
+        )
+        
+        if prepared.blob_id is not None:
+            db_file.blob_id = prepared.blob_id
+        elif prepared.content_hash:
+            db_file.blob = Blob(
+                content_hash=prepared.content_hash,
+                object_path=prepared.object_path,
+                file_size=prepared.file_size,
+                ref_count=1
+            )
+        return db_file
+    
+    @staticmethod
+    def _save_file_record(
+        db: Session,
+        user: User,
+        prepared: PreparedUpload,
+        description: Optional[str],
+        is_public: bool
     ) -> Optional[File]:
+        """Insert the file row; None if its shared blob was deleted after the lookup"""
+        if prepared.blob_id is not None and not FileService._add_blob_reference(
+            db, prepared.blob_id, 1, prepared.content_hash
+        ):
+            db.rollback()
+            # A concurrent upload may have stored the same content again
+            duplicate = FileService._prepare_duplicate(
+                db, prepared.content_hash, prepared.unique_filename,
+                prepared.original_filename, prepared.content_type
+            )
+            if not duplicate:
+                return None
+            return FileService._save_file_record(db, user, duplicate, description, is_public)
+        
+        db_file = FileService._new_file_record(user, prepared, description, is_public)
+        db.add(db_file)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            content_hash = prepared.content_hash
+            if prepared.blob_id is not None or not content_hash:
+                raise
+            # A concurrent upload registered the same content first
+            if prepared.object_path != FileService.blob_object_path(content_hash):
+                storage_client.delete_file(prepared.object_path)
+            duplicate = FileService._prepare_duplicate(
+                db, content_hash, prepared.unique_filename,
+                prepared.original_filename, prepared.content_type
+            )
+            if not duplicate:
+                raise
+            return FileService._save_file_record(db, user, duplicate, description, is_public)
+        db.refresh(db_file)
+        
+        if db_file.processing_status == "pending":
+            FileService.schedule_derivatives(db_file)
+        
+        return db_file
+    
+    @staticmethod
+    def save_file_records(
+        db: Session,
+        user: User,
+        prepared_uploads: List[PreparedUpload],
+        is_public: bool = False
+    ) -> List[Optional[File]]:
+        """Insert the rows for a batch in one transaction.
+        
+        If the batch conflicts with a concurrent upload or delete of the same
+        content, it is retried one commit per file so only the affected files fail.
+        """
+        records = []
+        new_blobs: Dict[str, Blob] = {}
+        conflict = False
+        try:
+            for prepared in prepared_uploads:
+                if prepared.blob_id is not None and not FileService._add_blob_reference(
+                    db, prepared.blob_id, 1, prepared.content_hash
+                ):
+                    conflict = True
+                    break
+                
+                db_file = FileService._new_file_record(user, prepared, None, is_public)
+                if db_file.blob is not None:
+                    # Identical files within the batch share one new blob
+                    blob = new_blobs.setdefault(prepared.content_hash, db_file.blob)
+                    if blob is not db_file.blob:
+                        blob.ref_count += 1
+                        db_file.blob = blob
+                db.add(db_file)
+                records.append(db_file)
+            
+            if not conflict:
+                db.commit()
+        except IntegrityError:
+            conflict = True
+        
+        if conflict:
+            db.rollback()
+            return [
+                FileService._save_file_record(db, user, prepared, None, is_public)
+                for prepared in prepared_uploads
+            ]
+        
+        for db_file in records:
+            db.refresh(db_file)
+            if db_file.processing_status == "pending":
+                FileService.schedule_derivatives(db_file)
+        return records
+    
+    @staticmethod
+    async def prepare_upload(
+        db: Session,
+        file: UploadFile,
+        user: User,
+        deduplicate: bool = True
+    ) -> PreparedUpload:
+        """Validate, process and store an upload without touching the database"""
         # Validate file
         is_valid, message = FileService.validate_file(file)
         if not is_valid:
             raise ValueError(message)
         
-        # Read file data
-        file_data = await file.read()
-        file_size = len(file_data)
+        # Reject content that doesn't match its extension before reading it all
+        sniffed = FileService.sniff_file(file)
+        content_type = sniffed.content_type
         
         # Generate unique filename
         unique_filename = FileService.generate_unique_filename(file.filename)
         
+        # Identical content is stored once; duplicates skip storage and processing
+        content_hash = await run_in_threadpool(
+            sha256_stream, file.file, settings.upload_chunk_size
+        )
+        if deduplicate:
+            duplicate = FileService._prepare_duplicate(
+                db, content_hash, unique_filename, file.filename, content_type
+            )
+            if duplicate:
+                return duplicate
+        object_path = FileService.blob_object_path(content_hash)
+        
         # Process image if applicable
-        thumbnail_path = None
+        renditions = None
         width = None
         height = None
-        is_image = ImageProcessor.is_image(file.content_type)
+        is_image = ImageProcessor.is_image(content_type)
+        queue_derivatives = FileService._queue_derivatives(is_image)
         
-        if is_image:
-            # Get image dimensions
-            image_info = ImageProcessor.get_image_info(file_data)
-            if image_info:
-                width, height, _ = image_info
-            
-            # Create and upload thumbnail
-            thumbnail_data = ImageProcessor.create_thumbnail(file_data)
-            if thumbnail_data:
-                thumbnail_filename = f"thumb_{unique_filename}"
-                thumbnail_io = io.BytesIO(thumbnail_data)
-                storage_client.upload_file(
-                    thumbnail_io,
-                    f"thumbnails/{thumbnail_filename}",
-                    "image/jpeg",
-                    len(thumbnail_data)
-                )
-                thumbnail_path = f"thumbnails/{thumbnail_filename}"
-            
-            # Optimize original image
-            optimized_data = ImageProcessor.optimize_image(file_data)
-            if optimized_data:
-                file_data = optimized_data
-                file_size = len(file_data)
-        
-        # Upload to MinIO
-        file_io = io.BytesIO(file_data)
-        object_path = f"uploads/{user.id}/{unique_filename}"
-        
-        success = storage_client.upload_file(
-            file_io,
-            object_path,
-            file.content_type,
-            file_size
-        )
+        if is_image and not queue_derivatives:
+            # Images are decoded and re-encoded, so they are read into memory
+            file_data = await file.read()
+            stored = await FileService._process_image(
+                file_data, object_path, content_type, content_hash
+            )
+            success = stored is not None
+            if success:
+                file_size, width, height, renditions = stored
+        else:
+            # Stream the spooled upload straight to storage in bounded parts;
+            # queued images are optimized later by the derivative workers
+            await file.seek(0)
+            reader = CountingReader(file.file)
+            success = await run_in_threadpool(
+                storage_client.upload_stream,
+                reader,
+                object_path,
+                content_type
+            )
+            file_size = reader.bytes_read
         
         if not success:
             raise ValueError("Failed to upload file to storage")
         
-        # Save metadata to database
-        db_file = File(
-            filename=unique_filename,
+        return PreparedUpload(
+            unique_filename=unique_filename,
             original_filename=file.filename,
-            file_path=object_path,
+            content_type=content_type,
+            object_path=object_path,
             file_size=file_size,
-            content_type=file.content_type,
-            file_extension=file.filename.rsplit('.', 1)[-1] if '.' in file.filename else None,
             is_image=is_image,
+            content_hash=content_hash,
             width=width,
             height=height,
-            thumbnail_path=thumbnail_path,
-            description=description,
-            is_public=is_public,
-            user_id=user.id
+            renditions=renditions,
+            processing_status="pending" if queue_derivatives else "ready"
         )
+    
+    @staticmethod
+    async def upload_file(
+        db: Session,
+        file: UploadFile,
+        user: User,
+        description: Optional[str] = None,
+        is_public: bool = False
+    ) -> Optional[File]:
+        prepared = await FileService.prepare_upload(db, file, user)
         
-        db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
-        
+        # Save metadata to database
+        db_file = FileService._save_file_record(db, user, prepared, description, is_public)
+        if db_file is None:
+            # The shared blob was deleted meanwhile, store the content again
+            prepared = await FileService.prepare_upload(db, file, user, deduplicate=False)
+            db_file = FileService._save_file_record(db, user, prepared, description, is_public)
         return db_file
     
+    @staticmethod
+    async def upload_files(
+        db: Session,
+        files: List[UploadFile],
+        user: User,
+        is_public: bool = False
+    ) -> List[Tuple[Optional[File], Optional[str]]]:
+        """Upload a batch with bounded concurrency and return (file, error) per input, in order"""
+        semaphore = asyncio.Semaphore(settings.upload_batch_concurrency)
+        
+        async def prepare(file: UploadFile) -> PreparedUpload:
+            async with semaphore:
+                return await FileService.prepare_upload(db, file, user)
+        
+        outcomes = await asyncio.gather(
+            *(prepare(file) for file in files),
+            return_exceptions=True
+        )
+        return await FileService.save_batch(db, user, outcomes, is_public, sources=files)
+    
+    @staticmethod
+    async def save_batch(
+        db: Session,
+        user: User,
+        outcomes: List,
+        is_public: bool = False,
+        sources: Optional[List[UploadFile]] = None
+    ) -> List[Tuple[Optional[File], Optional[str]]]:
+        """Insert rows for the prepared uploads among gathered outcomes and return (file, error) per outcome.
+        
+        Validation and storage errors become per-file error messages; anything
+        else is re-raised. With the uploads' sources, a duplicate whose shared
+        blob was deleted meanwhile is stored again instead of failing.
+        """
+        errors: List[Optional[str]] = []
+        for outcome in outcomes:
+            if isinstance(outcome, ValueError):
+                errors.append(str(outcome))
+            elif isinstance(outcome, HTTPException):
+                errors.append(outcome.detail)
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                errors.append(None)
+        
+        prepared_uploads = [outcome for outcome, error in zip(outcomes, errors) if error is None]
+        records = iter(FileService.save_file_records(db, user, prepared_uploads, is_public))
+        
+        results = []
+        for index, error in enumerate(errors):
+            if error is not None:
+                results.append((None, error))
+                continue
+            db_file = next(records)
+            if db_file is None and sources is not None:
+                try:
+                    prepared = await FileService.prepare_upload(db, sources[index], user, deduplicate=False)
+                    db_file = FileService._save_file_record(db, user, prepared, None, is_public)
+                except ValueError as e:
+                    results.append((None, str(e)))
+                    continue
+            if db_file is None:
+                results.append((None, "File content was removed during upload, please retry"))
+            else:
+                results.append((db_file, None))
+        return results
+    
+    @staticmethod
+    async def finalize_stored_upload(
+        db: Session,
+        user: User,
+        unique_filename: str,
+        original_filename: str,
+        object_path: str,
+        content_type: str,
+        file_size: int,
+        description: Optional[str] = None,
+        is_public: bool = False,
+        deduplicate: bool = True
+    ) -> File:
+        """Record an object that is already in storage, running the same image pipeline as upload_file.
+        
+        Without deduplicate the object is only read back when it is an image
+        processed inline; it gets no blob and is never shared.
+        """
+        renditions = None
+        width = None
+        height = None
+        is_image = ImageProcessor.is_image(content_type)
+        queue_derivatives = FileService._queue_derivatives(is_image)
+        
+        file_data = None
+        content_hash = None
+        if is_image and not queue_derivatives:
+            file_data = await run_in_threadpool(storage_client.download_file, object_path)
+            if file_data and deduplicate:
+                content_hash = hashlib.sha256(file_data).hexdigest()
+        elif deduplicate:
+            chunks = await run_in_threadpool(storage_client.iter_file, object_path)
+            if chunks is not None:
+                content_hash = await run_in_threadpool(sha256_chunks, chunks)
+        
+        if content_hash:
+            duplicate = FileService._prepare_duplicate(
+                db, content_hash, unique_filename, original_filename, content_type
+            )
+            db_file = FileService._save_file_record(
+                db, user, duplicate, description, is_public
+            ) if duplicate else None
+            if db_file:
+                await run_in_threadpool(storage_client.delete_file, object_path)
+                return db_file
+        
+        if file_data:
+            stored = await FileService._process_image(
+                file_data, object_path, content_type, content_hash or unique_filename
+            )
+            if stored is None:
+                # Don't leave the assembled upload behind either
+                await run_in_threadpool(storage_client.delete_file, object_path)
+                raise ValueError("Failed to upload file to storage")
+            file_size, width, height, renditions = stored
+        
+        return FileService._save_file_record(
+            db,
+            user,
+            PreparedUpload(
+                unique_filename=unique_filename,
+                original_filename=original_filename,
+                content_type=content_type,
+                object_path=object_path,
+                file_size=file_size,
+                is_image=is_image,
+                content_hash=content_hash,
+                width=width,
+                height=height,
+                renditions=renditions,
+                processing_status="pending" if queue_derivatives else "ready"
+            ),
+            description,
+            is_public
+        )
+    
     @staticmethod
     def get_file(db: Session, file_id: int) -> Optional[File]:
         return db.query(File).filter(File.id == file_id).first()
@@ -160,34 +729,165 @@ class FileService:
         db.add(file)
         db.commit()
         db.refresh(file)
+        object_cache.delete_prefix(FileService._object_cache_prefix(file))
         return file
     
     @staticmethod
-    def delete_file(db: Session, file: File) -> bool:
+    def _delete_stored_objects(file: File) -> None:
+        object_cache.delete_prefix(FileService._object_cache_prefix(file))
+        
         # Delete from MinIO
         storage_client.delete_file(file.file_path)
         
-        # Delete thumbnail if exists
+        # Delete thumbnail and renditions if they exist
         if file.thumbnail_path:
             storage_client.delete_file(file.thumbnail_path)
+        for name, object_path in (file.renditions or {}).items():
+            if object_path != file.thumbnail_path:
+                storage_client.delete_file(object_path)
         
-        # Delete from database
+        # Delete on-demand transforms
+        if file.is_image:
+            ImageService.delete_derivatives(file)
+    
+    @staticmethod
+    def delete_file(db: Session, file: File) -> bool:
+        if file.blob_id is None:
+            FileService._delete_stored_objects(file)
+            db.delete(file)
+            db.commit()
+            return True
+        
+        # Shared content is only removed with its last reference. The blob row
+        # stays locked until commit, so a concurrent duplicate upload either
+        # references it first or sees it gone and stores the content again.
+        blob_id = file.blob_id
+        FileService._add_blob_reference(db, blob_id, -1)
         db.delete(file)
+        db.flush()
+        removed = db.query(Blob).filter(
+            Blob.id == blob_id,
+            Blob.ref_count <= 0
+        ).delete(synchronize_session=False)
+        if removed:
+            FileService._delete_stored_objects(file)
         db.commit()
         return True
     
+    @staticmethod
+    def content_etag(file: File, variant: Optional[str] = None) -> str:
+        """Strong ETag of a file's stored content, or of a representation derived from it.
+        
+        Computed from the row alone so conditional requests never touch storage.
+        """
+        if file.blob and not variant and not file.content_updated_at:
+            return f'"{file.blob.content_hash}"'
+        
+        # Object paths are unique per upload and never rewritten; processing
+        # moves the content to a new object and records when
+        source = file.blob.content_hash if file.blob else f"{file.file_path}:{file.created_at.isoformat()}"
+        if file.content_updated_at:
+            source = f"{source}:{file.content_updated_at.isoformat()}"
+        digest = hashlib.sha256(f"{source}:{variant or ''}".encode()).hexdigest()
+        return f'"{digest}"'
+    
+    @staticmethod
+    def content_modified(file: File) -> datetime:
+        """Last-Modified of a file's stored content"""
+        return file.content_updated_at or file.created_at
+    
+    @staticmethod
+    def _object_cache_prefix(file: File) -> str:
+        return f"{file.file_path}@"
+    
+    @staticmethod
+    def object_cache_key(file: File) -> str:
+        """Hot-object cache key: the object path plus its content version"""
+        version = FileService.content_etag(file).strip('"')
+        return FileService._object_cache_prefix(file) + version
+    
+    @staticmethod
+    def metadata_etag(file: File) -> str:
+        timestamp = (file.updated_at or file.created_at).isoformat()
+        digest = hashlib.sha256(f"{file.id}:{timestamp}:{file.download_count}".encode()).hexdigest()
+        return f'"{digest}"'
+    
     @staticmethod
     def increment_download_count(db: Session, file: File) -> None:
-        file.download_count += 1
-        db.add(file)
+        """Count a download in Redis; flush_download_counts applies it to the row later"""
+        if not redis_client.increment_counter(DOWNLOAD_COUNTER, file.id):
+            FileService._add_download_counts(db, {file.id: 1})
+    
+    @staticmethod
+    def _add_download_counts(db: Session, counts: Dict[int, int], batch_id: Optional[str] = None) -> None:
+        """Add counts to the rows, recording the Redis batch they came from in the same transaction"""
+        files = File.__table__
+        db.execute(
+            update(files)
+            .where(files.c.id == bindparam("file_id"))
+            .values(download_count=func.coalesce(files.c.download_count, 0) + bindparam("delta")),
+            [{"file_id": file_id, "delta": delta} for file_id, delta in counts.items()]
+        )
+        if batch_id:
+            db.merge(CounterFlush(name=DOWNLOAD_COUNTER, batch_id=batch_id))
         db.commit()
     
+    @staticmethod
+    def flush_download_counts(db: Session) -> int:
+        """Apply download counts batched in Redis and return how many were written"""
+        lock = redis_client.acquire_lock("download_counts:flush", expire=60)
+        if not lock:
+            return 0
+        try:
+            batch_id, counts = redis_client.take_counters(DOWNLOAD_COUNTER)
+            if not counts:
+                return 0
+            
+            # A flush that died between commit and clear left its batch in Redis
+            applied = db.get(CounterFlush, DOWNLOAD_COUNTER)
+            written = 0
+            if applied is None or applied.batch_id != batch_id:
+                FileService._add_download_counts(
+                    db, {int(file_id): delta for file_id, delta in counts.items()}, batch_id
+                )
+                written = sum(counts.values())
+            redis_client.clear_taken_counters(DOWNLOAD_COUNTER)
+            return written
+        finally:
+            redis_client.release_lock("download_counts:flush", lock)
+    
+    @staticmethod
+    def with_live_download_counts(files: List[File]) -> List[File]:
+        """Add counts still pending in Redis to the loaded rows, without marking them dirty"""
+        pending = redis_client.get_counters(DOWNLOAD_COUNTER, [file.id for file in files])
+        for file, delta in zip(files, pending):
+            if delta:
+                set_committed_value(file, "download_count", (file.download_count or 0) + delta)
+        return files
+    
     @staticmethod
     def get_file_download_url(file: File, expires: int = 3600) -> Optional[str]:
         return storage_client.get_file_url(file.file_path, expires)
     
     @staticmethod
-    def get_thumbnail_url(file: File, expires: int = 3600) -> Optional[str]:
+    def get_rendition_paths(file: File) -> Dict[str, str]:
+        """Object path for every size a client can request, smallest first.
+        
+        Sizes that were skipped because the image already fits fall back to
+        the optimized original, which is capped at ImageProcessor.LARGE_SIZE.
+        """
+        if not file.is_image:
+            return {}
+        
+        stored = dict(file.renditions or {})
         if file.thumbnail_path:
-            return storage_client.get_file_url(file.thumbnail_path, expires)
-        return None
\ No newline at end of file
+            stored.setdefault("thumbnail", file.thumbnail_path)
+        
+        return {
+            name: stored.get(name, file.file_path)
+            for name in ImageProcessor.RENDITION_NAMES
+        }
+    
+    @staticmethod
+    def get_rendition_urls(file: File) -> Dict[str, str]:
+        return rendition_urls(file.id) if file.is_image else {}
\ No newline at end of file
@@ -0,0 +1,163 @@
+import bisect
+import hashlib
+import io
+from dataclasses import dataclass
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import derivative_cache
+from app.core.config import settings
+from app.core.image_pool import image_pool
+from app.core.storage import storage_client
+from app.models.file import File
+from app.utils.http import negotiate_image_format
+from app.utils.image import ImageProcessor
+
+
+@dataclass(frozen=True)
+class ImageTransform:
+    width: Optional[int]
+    height: Optional[int]
+    fit: str
+    format: str
+    quality: int
+    
+    @property
+    def name(self) -> str:
+        return f"{self.width or 0}x{self.height or 0}_{self.fit}_q{self.quality}.{self.format}"
+    
+    @property
+    def media_type(self) -> str:
+        return ImageProcessor.OUTPUT_FORMATS[self.format]
+
+
+class ImageService:
+    """On-demand image transforms backed by a two-level derivative cache.
+    
+    Transformed images are kept in a per-worker byte-bounded LRU and persisted
+    under a per-source ``derivatives/`` prefix in storage, so repeat requests
+    never decode the source again. Requested sizes and qualities are snapped
+    to the configured sets, which bounds how many derivatives one source can have.
+    """
+    
+    # Re-encode quality for full-size format variants
+    VARIANT_QUALITIES = {"jpeg": 85, "png": 85, "webp": 75, "avif": 60}
+    
+    @staticmethod
+    def _snap(value: Optional[int], allowed: List[int]) -> Optional[int]:
+        """Round up to the nearest allowed value, capped at the largest"""
+        if value is None:
+            return None
+        index = bisect.bisect_left(allowed, value)
+        return allowed[min(index, len(allowed) - 1)]
+    
+    @staticmethod
+    def normalize_transform(
+        width: Optional[int],
+        height: Optional[int],
+        fit: str = "contain",
+        format: Optional[str] = None,
+        quality: Optional[int] = None
+    ) -> ImageTransform:
+        fit = fit.lower()
+        if fit not in ImageProcessor.TRANSFORM_FITS:
+            raise ValueError(f"fit must be one of: {', '.join(ImageProcessor.TRANSFORM_FITS)}")
+        
+        format = (format or "jpeg").lower()
+        if format == "jpg":
+            format = "jpeg"
+        if format not in ImageProcessor.OUTPUT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(ImageProcessor.OUTPUT_FORMATS)}")
+        
+        sizes = settings.image_transform_sizes_list
+        return ImageTransform(
+            width=ImageService._snap(width, sizes),
+            height=ImageService._snap(height, sizes),
+            fit=fit,
+            format=format,
+            quality=ImageService._snap(quality or 85, settings.image_transform_qualities_list)
+        )
+    
+    @staticmethod
+    def derivative_prefix(file: File) -> str:
+        source_key = hashlib.sha256(file.file_path.encode()).hexdigest()[:32]
+        return f"derivatives/{source_key}/"
+    
+    @staticmethod
+    def negotiate_format(accept: Optional[str], source_media_type: str) -> Optional[str]:
+        """Modern format to serve instead of the stored one, if the client accepts it"""
+        preferred = [
+            fmt for fmt in settings.image_negotiate_formats_list
+            if fmt in ImageProcessor.OUTPUT_FORMATS
+        ]
+        format = negotiate_image_format(accept, preferred)
+        if format and ImageProcessor.OUTPUT_FORMATS[format] != source_media_type:
+            return format
+        return None
+    
+    @staticmethod
+    async def get_variant(
+        file: File,
+        source_path: str,
+        source_name: str,
+        format: str
+    ) -> Optional[bytes]:
+        """Full-size re-encode of a stored object, generated on first request"""
+        transform = ImageTransform(
+            width=None,
+            height=None,
+            fit="contain",
+            format=format,
+            quality=ImageService.VARIANT_QUALITIES.get(format, 85)
+        )
+        return await ImageService.get_transformed(file, transform, source_path, source_name)
+    
+    @staticmethod
+    async def get_transformed(
+        file: File,
+        transform: ImageTransform,
+        source_path: Optional[str] = None,
+        source_name: Optional[str] = None
+    ) -> Optional[bytes]:
+        object_path = ImageService.derivative_prefix(file) + (
+            f"{source_name}_{transform.name}" if source_name else transform.name
+        )
+        
+        data = derivative_cache.get(object_path)
+        if data is not None:
+            return data
+        
+        data = await run_in_threadpool(storage_client.download_file, object_path)
+        if not data:
+            source = await run_in_threadpool(storage_client.download_file, source_path or file.file_path)
+            if not source:
+                return None
+            
+            data = await image_pool.run(
+                ImageProcessor.transform,
+                source,
+                transform.width,
+                transform.height,
+                transform.fit,
+                transform.format,
+                transform.quality,
+                settings.image_resize_quality
+            )
+            if not data:
+                return None
+            
+            await run_in_threadpool(
+                storage_client.upload_file,
+                io.BytesIO(data),
+                object_path,
+                transform.media_type,
+                len(data)
+            )
+        
+        derivative_cache.set(object_path, data)
+        return data
+    
+    @staticmethod
+    def delete_derivatives(file: File) -> int:
+        prefix = ImageService.derivative_prefix(file)
+        derivative_cache.delete_prefix(prefix)
+        return storage_client.delete_prefix(prefix)
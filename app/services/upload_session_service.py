@@ -0,0 +1,167 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.exceptions import ConflictException, FileSizeException
+from app.core.redis import redis_client
+from app.core.validation import upload_policy
+from app.core.storage import storage_client
+from app.models.file import File
+from app.models.user import User
+from app.schemas.file import UploadSessionCreate
+from app.services.file_service import FileService
+
+
+class UploadSessionService:
+    """Resumable uploads backed by storage multipart uploads.
+    
+    Session state lives in Redis so any worker can accept the next chunk.
+    Every chunk except the last must be exactly ``upload_part_size`` bytes
+    and becomes one multipart part.
+    """
+    
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"upload_session:{session_id}"
+    
+    @staticmethod
+    def _save(session: dict) -> bool:
+        return redis_client.set(
+            UploadSessionService._key(session["id"]),
+            session,
+            settings.upload_session_ttl
+        )
+    
+    @staticmethod
+    def create_session(user: User, session_data: UploadSessionCreate) -> dict:
+        upload_policy.check_size(session_data.file_size)
+        is_valid, message = FileService.validate_metadata(
+            session_data.filename, session_data.file_size
+        )
+        if not is_valid:
+            raise ValueError(message)
+        
+        unique_filename = FileService.generate_unique_filename(session_data.filename)
+        object_path = f"uploads/{user.id}/{unique_filename}"
+        
+        upload_id = storage_client.create_multipart_upload(object_path, session_data.content_type)
+        if not upload_id:
+            raise ValueError("Failed to start upload in storage")
+        
+        session = {
+            "id": uuid.uuid4().hex,
+            "user_id": user.id,
+            "upload_id": upload_id,
+            "object_path": object_path,
+            "unique_filename": unique_filename,
+            "filename": session_data.filename,
+            "content_type": session_data.content_type,
+            "file_size": session_data.file_size,
+            "description": session_data.description,
+            "is_public": session_data.is_public,
+            "offset": 0,
+            "parts": [],
+            "expires_at": (datetime.utcnow() + timedelta(seconds=settings.upload_session_ttl)).isoformat()
+        }
+        
+        if not UploadSessionService._save(session):
+            storage_client.abort_multipart_upload(object_path, upload_id)
+            raise ValueError("Failed to create upload session")
+        
+        return session
+    
+    @staticmethod
+    def get_session(session_id: str) -> Optional[dict]:
+        session = redis_client.get(UploadSessionService._key(session_id))
+        return session if isinstance(session, dict) else None
+    
+    @staticmethod
+    def upload_chunk(session_id: str, offset: int, data: bytes) -> dict:
+        if len(data) > settings.upload_part_size:
+            raise FileSizeException(settings.upload_part_size)
+        
+        lock = redis_client.acquire_lock(UploadSessionService._key(session_id))
+        if not lock:
+            raise ConflictException("Another chunk for this upload is in progress")
+        
+        try:
+            # Re-read under the lock, another worker may have advanced the offset
+            session = UploadSessionService.get_session(session_id)
+            if not session:
+                raise ValueError("Upload session not found")
+            
+            if offset != session["offset"]:
+                raise ConflictException(f"Expected chunk at offset {session['offset']}")
+            
+            end = offset + len(data)
+            if end > session["file_size"]:
+                raise ValueError("Chunk exceeds declared file size")
+            if end < session["file_size"] and len(data) != settings.upload_part_size:
+                raise ValueError(f"Chunks must be {settings.upload_part_size} bytes except the last one")
+            if not data:
+                raise ValueError("Empty chunk")
+            if offset == 0:
+                # Sniff the first chunk so mismatched content is refused before the rest arrives
+                sniffed = upload_policy.check_content(session["filename"], data[:upload_policy.sniff_size])
+                session["content_type"] = sniffed.content_type
+            
+            part_number = len(session["parts"]) + 1
+            etag = storage_client.upload_part(
+                session["object_path"],
+                session["upload_id"],
+                part_number,
+                data
+            )
+            if not etag:
+                raise ValueError("Failed to store chunk")
+            
+            session["parts"].append([part_number, etag])
+            session["offset"] = end
+            UploadSessionService._save(session)
+            return session
+        finally:
+            redis_client.release_lock(UploadSessionService._key(session_id), lock)
+    
+    @staticmethod
+    async def complete_session(db: Session, session: dict, user: User) -> File:
+        if session["offset"] != session["file_size"]:
+            raise ValueError(
+                f"Upload incomplete: received {session['offset']} of {session['file_size']} bytes"
+            )
+        
+        if session["upload_id"]:
+            if not await run_in_threadpool(
+                storage_client.complete_multipart_upload,
+                session["object_path"],
+                session["upload_id"],
+                [tuple(part) for part in session["parts"]]
+            ):
+                raise ValueError("Failed to assemble upload in storage")
+            # A retry after a failed finalize must not assemble the parts again
+            session["upload_id"] = None
+            UploadSessionService._save(session)
+        
+        # The session stays until the file row is committed, so a failure can be retried
+        db_file = await FileService.finalize_stored_upload(
+            db,
+            user,
+            unique_filename=session["unique_filename"],
+            original_filename=session["filename"],
+            object_path=session["object_path"],
+            content_type=session["content_type"],
+            file_size=session["file_size"],
+            description=session["description"],
+            is_public=session["is_public"]
+        )
+        redis_client.delete(UploadSessionService._key(session["id"]))
+        return db_file
+    
+    @staticmethod
+    def abort_session(session: dict) -> bool:
+        if session["upload_id"]:
+            storage_client.abort_multipart_upload(session["object_path"], session["upload_id"])
+        else:
+            storage_client.delete_file(session["object_path"])
+        return redis_client.delete(UploadSessionService._key(session["id"]))
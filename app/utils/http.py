@@ -0,0 +1,142 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# More ranges than this in one request are ignored and the whole object is sent
+MAX_RANGES = 16
+
+
+def parse_accept(header: Optional[str]) -> Dict[str, float]:
+    """Map each media range in an Accept header to its q-value"""
+    accepted = {}
+    if not header:
+        return accepted
+    
+    for item in header.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        media_type = parts[0].lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[media_type] = quality
+    return accepted
+
+
+def negotiate_image_format(header: Optional[str], preferred: Iterable[str]) -> Optional[str]:
+    """Pick the first preferred image format the client explicitly accepts.
+    
+    Wildcards are ignored on purpose: browsers send ``*/*`` on image requests
+    whether or not they can decode newer formats. Navigations, which accept
+    ``text/html``, get no format either: a user following a download link
+    wants the file as stored, even though browsers list image types there too.
+    """
+    accepted = parse_accept(header)
+    if accepted.get("text/html", 0) > 0:
+        return None
+    for format in preferred:
+        if accepted.get(f"image/{format}", 0) > 0:
+            return format
+    return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """Satisfiable ``(start, end)`` byte ranges of a Range header, ends inclusive.
+    
+    Returns None when the header should be ignored (absent, malformed or too
+    many ranges) and an empty list when none of the ranges can be satisfied.
+    """
+    if not header:
+        return None
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+    
+    specs = specs.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+    
+    ranges = []
+    for spec in specs:
+        first, dash, last = spec.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if start < 0 or (last and end < start):
+                    return None
+            else:
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start = max(size - suffix, 0)
+                end = size - 1
+        except ValueError:
+            return None
+        
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    return ranges
+
+
+def http_date(value: datetime) -> str:
+    """IMF-fixdate for a naive UTC datetime"""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _parse_http_date(header: Optional[str]) -> Optional[datetime]:
+    if not header:
+        return None
+    try:
+        value = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _etag_values(header: str) -> List[str]:
+    return [value.strip() for value in header.split(",") if value.strip()]
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: datetime
+) -> bool:
+    """Whether a GET's validators still match, per RFC 9110 precedence.
+    
+    If-None-Match uses weak comparison and, when present, If-Modified-Since
+    is ignored.
+    """
+    if if_none_match:
+        values = _etag_values(if_none_match)
+        opaque = etag.removeprefix("W/")
+        return "*" in values or any(value.removeprefix("W/") == opaque for value in values)
+    
+    since = _parse_http_date(if_modified_since)
+    if since is None:
+        return False
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: datetime) -> bool:
+    """Whether a Range request may be honoured given its If-Range validator"""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return if_range == etag
+    if if_range.startswith("W/"):
+        return False
+    since = _parse_http_date(if_range)
+    return since is not None and last_modified.replace(tzinfo=timezone.utc, microsecond=0) == since
@@ -1,17 +1,212 @@
 import io
-from typing import Tuple, Optional, BinaryIO
-from PIL import Image
+from dataclasses import dataclass, field
+from typing import Dict, NamedTuple, Tuple, Optional, BinaryIO
+from PIL import Image, ImageOps, features
+
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF plugin with Pillow
+    AVIF_SUPPORTED = True
+except ImportError:
+    AVIF_SUPPORTED = False
+
+WEBP_SUPPORTED = features.check("webp")
+
+
+class ResizeProfile(NamedTuple):
+    """Quality/speed trade-off for downscaling.
+    
+    draft_gap: decode JPEGs via DCT scaling to at least this multiple of the
+        target size (None disables draft mode)
+    reducing_gap: passed to Image.thumbnail for its fast integer reduce step
+        (None always resamples from the full image)
+    """
+    draft_gap: Optional[float]
+    reducing_gap: Optional[float]
+    resample: Image.Resampling
+
+
+RESIZE_PROFILES: Dict[str, ResizeProfile] = {
+    "fast": ResizeProfile(1.0, 1.5, Image.Resampling.BILINEAR),
+    "balanced": ResizeProfile(2.0, 2.0, Image.Resampling.LANCZOS),
+    "best": ResizeProfile(None, None, Image.Resampling.LANCZOS),
+}
+
+
+@dataclass
+class ProcessedImage:
+    """Everything derived from a single decode of an uploaded image"""
+    width: int
+    height: int
+    format: str
+    optimized: bytes
+    thumbnails: Dict[str, bytes] = field(default_factory=dict)
 
 
 class ImageProcessor:
+    IMAGE_CONTENT_TYPES = frozenset({'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp'})
+    
     THUMBNAIL_SIZE = (200, 200)
     MEDIUM_SIZE = (800, 800)
     LARGE_SIZE = (1920, 1920)
     
+    # Stored alongside the optimized original, which doubles as the "large" size
+    RENDITION_SIZES = {
+        "medium": MEDIUM_SIZE,
+        "thumbnail": THUMBNAIL_SIZE,
+    }
+    RENDITION_NAMES = ("thumbnail", "medium", "large")
+    
+    # Output formats for on-demand transforms
+    OUTPUT_FORMATS = {
+        "jpeg": "image/jpeg",
+        "png": "image/png",
+        **({"webp": "image/webp"} if WEBP_SUPPORTED else {}),
+        **({"avif": "image/avif"} if AVIF_SUPPORTED else {}),
+    }
+    TRANSFORM_FITS = ("contain", "cover")
+    
     @staticmethod
     def is_image(content_type: str) -> bool:
-        image_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp']
-        return content_type.lower() in image_types
+        return content_type.lower() in ImageProcessor.IMAGE_CONTENT_TYPES
+    
+    @staticmethod
+    def flatten_to_rgb(img: Image.Image) -> Image.Image:
+        """Composite transparent images onto white so they can be saved as JPEG"""
+        if img.mode in ('RGBA', 'LA', 'P'):
+            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            rgb_img.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            return rgb_img
+        return img
+    
+    @staticmethod
+    def get_profile(quality: str) -> ResizeProfile:
+        return RESIZE_PROFILES.get(quality, RESIZE_PROFILES["balanced"])
+    
+    @staticmethod
+    def fit_size(size: Tuple[int, int], max_size: Tuple[int, int]) -> Tuple[int, int]:
+        """Size of an image scaled down to fit max_size, keeping aspect ratio"""
+        scale = min(max_size[0] / size[0], max_size[1] / size[1], 1.0)
+        return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+    
+    @staticmethod
+    def apply_draft(img: Image.Image, max_size: Tuple[int, int], profile: ResizeProfile) -> None:
+        """Let the JPEG decoder scale down before the image is loaded"""
+        if profile.draft_gap is None or img.format != 'JPEG':
+            return
+        target = ImageProcessor.fit_size(img.size, max_size)
+        img.draft(None, (int(target[0] * profile.draft_gap), int(target[1] * profile.draft_gap)))
+    
+    @staticmethod
+    def encode_jpeg(img: Image.Image, quality: int) -> bytes:
+        output = io.BytesIO()
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+        return output.getvalue()
+    
+    @staticmethod
+    def encode(img: Image.Image, format: str, quality: int) -> bytes:
+        if format == "jpeg":
+            return ImageProcessor.encode_jpeg(ImageProcessor.flatten_to_rgb(img), quality)
+        
+        output = io.BytesIO()
+        if format in ("webp", "avif"):
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() or img.mode == 'P' else 'RGB')
+            if format == "webp":
+                img.save(output, format='WEBP', quality=quality, method=4)
+            else:
+                img.save(output, format='AVIF', quality=quality)
+        else:
+            img.save(output, format=format.upper())
+        return output.getvalue()
+    
+    @staticmethod
+    def transform(
+        file_data: bytes,
+        width: Optional[int],
+        height: Optional[int],
+        fit: str = "contain",
+        format: str = "jpeg",
+        quality: int = 85,
+        resize_quality: str = "balanced"
+    ) -> Optional[bytes]:
+        """Resize into a width x height box and re-encode; never upscales.
+        
+        "contain" keeps the whole image inside the box, "cover" fills the box
+        and crops the overflow (it needs both width and height).
+        """
+        profile = ImageProcessor.get_profile(resize_quality)
+        try:
+            with Image.open(io.BytesIO(file_data)) as img:
+                if fit == "cover" and width and height:
+                    # Shrink the box rather than upscale small images
+                    scale = min(img.width / width, img.height / height, 1.0)
+                    box = (max(1, round(width * scale)), max(1, round(height * scale)))
+                    cover = max(box[0] / img.width, box[1] / img.height)
+                    ImageProcessor.apply_draft(
+                        img, (round(img.width * cover), round(img.height * cover)), profile
+                    )
+                    img = ImageOps.fit(img, box, method=profile.resample)
+                elif width or height:
+                    box = (width or img.width, height or img.height)
+                    ImageProcessor.apply_draft(img, box, profile)
+                    img.thumbnail(box, profile.resample, reducing_gap=profile.reducing_gap)
+                
+                return ImageProcessor.encode(img, format, quality)
+        except Exception as e:
+            print(f"Error transforming image: {e}")
+            return None
+    
+    @staticmethod
+    def process_image(
+        file_data: bytes,
+        thumbnail_sizes: Optional[Dict[str, Tuple[int, int]]] = None,
+        quality: str = "balanced"
+    ) -> Optional[ProcessedImage]:
+        """Decode once and derive dimensions, the optimized original and thumbnails.
+        
+        Each thumbnail is downscaled from the next larger output instead of the
+        full-resolution decode. Sizes the image already fits in are skipped,
+        except "thumbnail" which is always produced.
+        """
+        if thumbnail_sizes is None:
+            thumbnail_sizes = ImageProcessor.RENDITION_SIZES
+        profile = ImageProcessor.get_profile(quality)
+        
+        try:
+            with Image.open(io.BytesIO(file_data)) as source:
+                width, height = source.size
+                format = source.format.lower() if source.format else 'unknown'
+                
+                # The largest output is the capped original, decode no bigger than needed
+                ImageProcessor.apply_draft(source, ImageProcessor.LARGE_SIZE, profile)
+                img = ImageProcessor.flatten_to_rgb(source)
+                
+                # Cap the stored original at LARGE_SIZE
+                if img.width > ImageProcessor.LARGE_SIZE[0] or img.height > ImageProcessor.LARGE_SIZE[1]:
+                    img.thumbnail(ImageProcessor.LARGE_SIZE, profile.resample, reducing_gap=profile.reducing_gap)
+                
+                thumbnails = {}
+                previous = img
+                for name, size in sorted(thumbnail_sizes.items(), key=lambda item: -item[1][0] * item[1][1]):
+                    if name != "thumbnail" and previous.width <= size[0] and previous.height <= size[1]:
+                        continue
+                    thumb = previous.copy()
+                    thumb.thumbnail(size, profile.resample, reducing_gap=profile.reducing_gap)
+                    thumbnails[name] = ImageProcessor.encode_jpeg(thumb, quality=85)
+                    previous = thumb
+                
+                return ProcessedImage(
+                    width=width,
+                    height=height,
+                    format=format,
+                    optimized=ImageProcessor.encode_jpeg(img, quality=85),
+                    thumbnails=thumbnails
+                )
+        except Exception as e:
+            print(f"Error processing image: {e}")
+            return None
     
     @staticmethod
     def get_image_info(file_data: bytes) -> Optional[Tuple[int, int, str]]:
@@ -25,51 +220,39 @@ class ImageProcessor:
             return None
     
     @staticmethod
-    def create_thumbnail(file_data: bytes) -> Optional[bytes]:
+    def create_thumbnail(file_data: bytes, quality: str = "balanced") -> Optional[bytes]:
+        profile = ImageProcessor.get_profile(quality)
         try:
             with Image.open(io.BytesIO(file_data)) as img:
-                # Convert RGBA to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    rgb_img.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = rgb_img
+                ImageProcessor.apply_draft(img, ImageProcessor.THUMBNAIL_SIZE, profile)
+                img = ImageProcessor.flatten_to_rgb(img)
                 
                 # Create thumbnail
-                img.thumbnail(ImageProcessor.THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+                img.thumbnail(ImageProcessor.THUMBNAIL_SIZE, profile.resample, reducing_gap=profile.reducing_gap)
                 
-                # Save to bytes
-                output = io.BytesIO()
-                img.save(output, format='JPEG', quality=85, optimize=True)
-                output.seek(0)
-                return output.read()
+                return ImageProcessor.encode_jpeg(img, quality=85)
         except Exception as e:
             print(f"Error creating thumbnail: {e}")
             return None
     
     @staticmethod
-    def resize_image(file_data: bytes, max_size: Tuple[int, int]) -> Optional[bytes]:
+    def resize_image(
+        file_data: bytes,
+        max_size: Tuple[int, int],
+        quality: str = "balanced"
+    ) -> Optional[bytes]:
+        profile = ImageProcessor.get_profile(quality)
         try:
             with Image.open(io.BytesIO(file_data)) as img:
                 # Only resize if image is larger than max_size
                 if img.width > max_size[0] or img.height > max_size[1]:
-                    # Convert RGBA to RGB if necessary
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                        if img.mode == 'P':
-                            img = img.convert('RGBA')
-                        rgb_img.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                        img = rgb_img
+                    ImageProcessor.apply_draft(img, max_size, profile)
+                    img = ImageProcessor.flatten_to_rgb(img)
                     
                     # Resize maintaining aspect ratio
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+                    img.thumbnail(max_size, profile.resample, reducing_gap=profile.reducing_gap)
                     
-                    # Save to bytes
-                    output = io.BytesIO()
-                    img.save(output, format='JPEG', quality=90, optimize=True)
-                    output.seek(0)
-                    return output.read()
+                    return ImageProcessor.encode_jpeg(img, quality=90)
                 else:
                     return file_data
         except Exception as e:
@@ -77,26 +260,19 @@ class ImageProcessor:
             return None
     
     @staticmethod
-    def optimize_image(file_data: bytes) -> Optional[bytes]:
+    def optimize_image(file_data: bytes, quality: str = "balanced") -> Optional[bytes]:
+        profile = ImageProcessor.get_profile(quality)
         try:
             with Image.open(io.BytesIO(file_data)) as img:
-                # Convert RGBA to RGB if necessary for JPEG
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    rgb_img.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = rgb_img
+                ImageProcessor.apply_draft(img, ImageProcessor.LARGE_SIZE, profile)
+                img = ImageProcessor.flatten_to_rgb(img)
                 
                 # Resize if too large
                 if img.width > ImageProcessor.LARGE_SIZE[0] or img.height > ImageProcessor.LARGE_SIZE[1]:
-                    img.thumbnail(ImageProcessor.LARGE_SIZE, Image.Resampling.LANCZOS)
+                    img.thumbnail(ImageProcessor.LARGE_SIZE, profile.resample, reducing_gap=profile.reducing_gap)
                 
                 # Save optimized
-                output = io.BytesIO()
-                img.save(output, format='JPEG', quality=85, optimize=True)
-                output.seek(0)
-                return output.read()
+                return ImageProcessor.encode_jpeg(img, quality=85)
         except Exception as e:
             print(f"Error optimizing image: {e}")
             return None
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+from functools import partial
+from typing import List, Mapping, Optional
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.core.config import settings
+from app.utils.stream import Segment
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class SendfileResponse(Response):
+    """Sends slices of a local file without copying them through Python.
+    
+    Servers that advertise the ASGI ``http.response.zerocopysend`` extension
+    get the open descriptor and hand each slice to ``sendfile(2)``. Elsewhere
+    the slices are read with ``pread`` in a worker thread, one chunk at a time.
+    Literal segments (multipart headers) are sent as ordinary body messages.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        segments: List[Segment],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None
+    ):
+        self.path = path
+        self.segments = segments
+        self.chunk_size = settings.upload_chunk_size
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self.init_headers(headers)
+        self.headers["content-length"] = str(sum(
+            len(segment) if isinstance(segment, bytes) else segment[1]
+            for segment in segments
+        ))
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers
+            })
+            zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+            
+            async with anyio.create_task_group() as task_group:
+                async def send_body():
+                    await self._send_segments(file, zerocopy, send)
+                    task_group.cancel_scope.cancel()
+                
+                task_group.start_soon(send_body)
+                await self._wait_for_disconnect(receive)
+                task_group.cancel_scope.cancel()
+        finally:
+            file.close()
+        
+        if self.background is not None:
+            await self.background()
+    
+    async def _send_segments(self, file, zerocopy: bool, send: Send) -> None:
+        for segment in self.segments:
+            if isinstance(segment, bytes):
+                await send({"type": "http.response.body", "body": segment, "more_body": True})
+            elif zerocopy:
+                offset, count = segment
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": True
+                })
+            else:
+                await self._send_slice(file.fileno(), *segment, send)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    
+    async def _send_slice(self, fd: int, offset: int, count: int, send: Send) -> None:
+        end = offset + count
+        while offset < end:
+            chunk = await anyio.to_thread.run_sync(
+                partial(os.pread, fd, min(self.chunk_size, end - offset), offset)
+            )
+            if not chunk:
+                raise IOError(f"{self.path} ended before byte {end}")
+            offset += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    
+    @staticmethod
+    async def _wait_for_disconnect(receive: Receive) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
@@ -0,0 +1,195 @@
+import hashlib
+import io
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Literal bytes, or an (offset, length) slice of the object
+Segment = Union[bytes, Tuple[int, int]]
+
+
+class CountingReader:
+    """File-like wrapper that counts the bytes handed out by read()"""
+    
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.bytes_read = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # Storage fallbacks rewind to the start before retrying
+        position = self.stream.seek(offset, whence)
+        self.bytes_read = position
+        return position
+
+
+def sha256_stream(stream: BinaryIO, chunk_size: int) -> str:
+    """Hex SHA-256 of a seekable stream, rewound to the start afterwards"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def sha256_chunks(chunks: Iterable[bytes]) -> str:
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ByteRangesStream:
+    """multipart/byteranges body that opens each range only when it is reached.
+    
+    open_range(offset, length) returns a closeable chunk iterable over that
+    slice of the object, so only the requested bytes are ever read.
+    """
+    
+    def __init__(
+        self,
+        open_range: Callable[[int, int], Optional[Iterable[bytes]]],
+        ranges: List[Tuple[int, int]],
+        size: int,
+        media_type: str,
+        boundary: str
+    ):
+        self.open_range = open_range
+        self.ranges = ranges
+        self.size = size
+        self.media_type = media_type
+        self.boundary = boundary
+        self._current = None
+        self._closed = False
+    
+    @property
+    def content_type(self) -> str:
+        return f"multipart/byteranges; boundary={self.boundary}"
+    
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {self.media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.size}\r\n\r\n"
+        ).encode()
+    
+    def segments(self) -> List[Segment]:
+        """Body as literal part headers interleaved with slices of the object"""
+        segments = []
+        for start, end in self.ranges:
+            segments += [self._part_header(start, end), (start, end - start + 1), b"\r\n"]
+        segments.append(f"--{self.boundary}--\r\n".encode())
+        return segments
+    
+    @property
+    def content_length(self) -> int:
+        return sum(
+            len(segment) if isinstance(segment, bytes) else segment[1]
+            for segment in self.segments()
+        )
+    
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            for segment in self.segments():
+                if self._closed:
+                    return
+                if isinstance(segment, bytes):
+                    yield segment
+                    continue
+                offset, length = segment
+                self._current = self.open_range(offset, length)
+                if self._current is None:
+                    raise IOError(f"Failed to open byte range {offset}-{offset + length - 1}")
+                yield from self._current
+        finally:
+            self.close()
+    
+    def close(self):
+        self._closed = True
+        if self._current is not None:
+            self._current.close()
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable buffer, so zipfile streams entries with data descriptors"""
+    
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    name: str
+    date_time: Tuple[int, int, int, int, int, int]
+    compress_type: int
+    open: Callable[[], Optional[Iterable[bytes]]]
+
+
+class ZipStream:
+    """Zip archive produced chunk by chunk while its entries are read.
+    
+    Each entry's source is opened only when it is reached and released as
+    soon as it is written, so memory stays bounded by one source chunk. ZIP64
+    records are written whenever an entry or the archive needs them.
+    """
+    
+    def __init__(self, entries: List[ZipEntry]):
+        self.entries = entries
+        self._current = None
+        self._closed = False
+    
+    def __iter__(self) -> Iterator[bytes]:
+        sink = _ZipSink()
+        try:
+            with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+                for entry in self.entries:
+                    if self._closed:
+                        return
+                    self._current = entry.open()
+                    if self._current is None:
+                        raise IOError(f"Failed to open {entry.name}")
+                    
+                    info = zipfile.ZipInfo(entry.name, entry.date_time)
+                    info.compress_type = entry.compress_type
+                    size = getattr(self._current, "size", None)
+                    if size is not None:
+                        info.file_size = size
+                    
+                    # Without a known size zipfile can't tell up front whether ZIP64 is needed
+                    with archive.open(info, "w", force_zip64=size is None) as target:
+                        for chunk in self._current:
+                            target.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                    yield sink.drain()
+            yield sink.drain()
+        finally:
+            self.close()
+    
+    def close(self):
+        self._closed = True
+        if self._current is not None:
+            self._current.close()
@@ -0,0 +1,90 @@
+"""Derivative worker: generates thumbnails and optimized images for queued uploads.
+
+Run with ``python -m app.workers.derivatives``. Workers only need database,
+Redis and storage access, so they can run on nodes separate from the API.
+Pass ``--requeue-pending`` to re-enqueue files left pending or processing
+(for example after a Redis outage or a worker crash); jobs are idempotent.
+"""
+import argparse
+import logging
+import signal
+import time
+from app.core.database import SessionLocal
+from app.core.logging_config import setup_logging
+from app.core.redis import redis_client
+from app.models.file import File
+from app.services.file_service import FileService, DERIVATIVE_QUEUE
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before retrying a job whose blob another worker is processing
+RETRY_DELAY = 1
+
+running = True
+
+
+def stop(signum, frame):
+    global running
+    running = False
+
+
+def process_job(job: dict) -> None:
+    db = SessionLocal()
+    try:
+        file = db.query(File).filter(File.id == job.get("file_id")).first()
+        if not file or file.processing_status == "ready":
+            return
+        
+        result = FileService.generate_derivatives(db, file)
+        if result is None:
+            # Picked up again once the other worker is done with the blob
+            time.sleep(RETRY_DELAY)
+            FileService.schedule_derivatives(file)
+        elif result:
+            logger.info(f"Generated derivatives for file {file.id}")
+        else:
+            logger.warning(f"Could not process image for file {file.id}")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Derivative job {job} failed: {e}")
+    finally:
+        db.close()
+
+
+def requeue_pending() -> int:
+    db = SessionLocal()
+    try:
+        files = db.query(File).filter(
+            File.processing_status.in_(["pending", "processing"])
+        ).all()
+        for file in files:
+            FileService.schedule_derivatives(file)
+        return len(files)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued image derivatives")
+    parser.add_argument("--requeue-pending", action="store_true", help="re-enqueue unfinished files and exit")
+    args = parser.parse_args()
+    
+    setup_logging()
+    
+    if args.requeue_pending:
+        logger.info(f"Re-enqueued {requeue_pending()} files")
+        return
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    logger.info("Derivative worker started")
+    while running:
+        job = redis_client.dequeue(DERIVATIVE_QUEUE, timeout=5)
+        if job:
+            process_job(job)
+    logger.info("Derivative worker stopped")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
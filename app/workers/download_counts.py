@@ -0,0 +1,46 @@
+"""Download count flusher: applies counts batched in Redis to the files table.
+
+The API runs ``run_flusher`` in the background of every process; the Redis
+lock in ``FileService.flush_download_counts`` keeps flushes from overlapping.
+Run ``python -m app.workers.download_counts`` to flush once by hand, for
+example before reading counts straight from the database.
+"""
+import asyncio
+import logging
+from starlette.concurrency import run_in_threadpool
+from app.core.database import SessionLocal
+from app.core.logging_config import setup_logging
+from app.services.file_service import FileService
+
+logger = logging.getLogger(__name__)
+
+
+def flush() -> int:
+    db = SessionLocal()
+    try:
+        return FileService.flush_download_counts(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Download count flush failed: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+async def run_flusher(interval: int) -> None:
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await run_in_threadpool(flush)
+    finally:
+        # Don't strand counts in Redis on shutdown
+        await run_in_threadpool(flush)
+
+
+def main():
+    setup_logging()
+    logger.info(f"Flushed {flush()} downloads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Compare throughput and peak RSS of download paths for the local storage backend.
+
+buffered  - whole object read into bytes and wrapped in BytesIO (original path)
+streamed  - ObjectStream chunks through StreamingResponse
+sendfile  - SendfileResponse reading with pread in a worker thread
+zerocopy  - SendfileResponse on a server with the ASGI zerocopysend extension,
+            simulated here with os.sendfile into /dev/null
+
+Each path runs in a fresh process so peak RSS is not shared between them.
+
+Usage: python scripts/bench_downloads.py [size_mb] [iterations]
+"""
+import sys
+import os
+import io
+import asyncio
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.responses import StreamingResponse
+from app.core.storage_fallback import LocalStorageClient
+from app.utils.responses import ZEROCOPY_EXTENSION, SendfileResponse
+
+MODES = ["buffered", "streamed", "sendfile", "zerocopy"]
+
+
+def make_response(mode, client, object_name, path):
+    if mode == "buffered":
+        return StreamingResponse(io.BytesIO(client.download_file(object_name)))
+    if mode == "streamed":
+        stream = client.iter_file(object_name)
+        return StreamingResponse(iter(stream))
+    return SendfileResponse(path, [(0, os.path.getsize(path))])
+
+
+async def serve(response, mode, sink):
+    async def receive():
+        await asyncio.Event().wait()
+    
+    async def send(message):
+        if message["type"] == ZEROCOPY_EXTENSION:
+            offset, count = message["offset"], message["count"]
+            while count:
+                sent = os.sendfile(sink, message["file"].fileno(), offset, count)
+                offset += sent
+                count -= sent
+        elif message.get("body"):
+            os.write(sink, message["body"])
+    
+    extensions = {ZEROCOPY_EXTENSION: {}} if mode == "zerocopy" else {}
+    await response({"type": "http", "method": "GET", "extensions": extensions}, receive, send)
+
+
+def run_mode(mode, directory, iterations):
+    client = LocalStorageClient()
+    client.storage_path = Path(directory)
+    path = os.path.join(directory, "sample.bin")
+    size = os.path.getsize(path)
+    sink = os.open(os.devnull, os.O_WRONLY)
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        asyncio.run(serve(make_response(mode, client, "sample.bin", path), mode, sink))
+    elapsed = time.perf_counter() - start
+    
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{size * iterations / elapsed / 2**20:.1f} {peak_rss:.1f}")
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "sample.bin"), "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(2**20))
+        
+        print(f"{size_mb} MB object, {iterations} downloads per path")
+        print(f"{'path':<12}{'MB/s':>10}{'peak RSS MB':>14}")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", mode, directory, str(iterations)],
+                capture_output=True, text=True, check=True
+            ).stdout.splitlines()[-1].split()
+            print(f"{mode:<12}{float(output[0]):>10.1f}{float(output[1]):>14.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run_mode(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Compare CPU time per image upload: one decode per output vs single-pass pipeline.
+
+Both paths produce the same outputs: dimensions, the optimized original and
+every size in ImageProcessor.RENDITION_SIZES.
+
+Usage: python scripts/bench_image_pipeline.py [iterations]
+"""
+import sys
+import os
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from app.utils.image import ImageProcessor
+
+
+def make_sample(size, mode, format):
+    noise = Image.effect_noise(size, 64).convert('RGB')
+    gradient = Image.linear_gradient('L').resize(size).convert('RGB')
+    img = Image.blend(noise, gradient, 0.6)
+    if mode == 'RGBA':
+        img = img.convert('RGBA')
+        img.putalpha(Image.linear_gradient('L').resize(size))
+    output = io.BytesIO()
+    img.save(output, format=format, quality=92)
+    return output.getvalue()
+
+
+def legacy_pipeline(file_data):
+    ImageProcessor.get_image_info(file_data)
+    ImageProcessor.create_thumbnail(file_data)
+    for name, size in ImageProcessor.RENDITION_SIZES.items():
+        if name != "thumbnail":
+            ImageProcessor.resize_image(file_data, size)
+    ImageProcessor.optimize_image(file_data)
+
+
+def single_pass_pipeline(file_data):
+    ImageProcessor.process_image(file_data)
+
+
+def measure(func, file_data, iterations):
+    func(file_data)  # warm up
+    start = time.process_time()
+    for _ in range(iterations):
+        func(file_data)
+    return (time.process_time() - start) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [
+        ("JPEG 4000x3000 (12 MP)", make_sample((4000, 3000), 'RGB', 'JPEG')),
+        ("JPEG 1600x1200 (2 MP)", make_sample((1600, 1200), 'RGB', 'JPEG')),
+        ("PNG RGBA 2000x2000 (4 MP)", make_sample((2000, 2000), 'RGBA', 'PNG')),
+    ]
+    
+    print(f"CPU ms per upload, mean of {iterations} runs")
+    print(f"{'input':<28}{'legacy':>10}{'single':>10}{'speedup':>10}")
+    for name, file_data in samples:
+        legacy = measure(legacy_pipeline, file_data, iterations)
+        single = measure(single_pass_pipeline, file_data, iterations)
+        print(f"{name:<28}{legacy:>10.1f}{single:>10.1f}{legacy / single:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
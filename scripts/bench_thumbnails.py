@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Thumbnail throughput on large JPEGs for each IMAGE_RESIZE_QUALITY profile.
+
+Usage: python scripts/bench_thumbnails.py [iterations]
+"""
+import sys
+import os
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from app.utils.image import ImageProcessor, RESIZE_PROFILES
+
+SIZES = [
+    ("12 MP", (4000, 3000)),
+    ("24 MP", (6000, 4000)),
+    ("48 MP", (8000, 6000)),
+]
+
+
+def make_jpeg(size):
+    # Upscaled noise gives photo-like detail without generating 48 MP of noise
+    noise = Image.effect_noise((size[0] // 4, size[1] // 4), 64).resize(size, Image.Resampling.BILINEAR)
+    gradient = Image.linear_gradient('L').resize(size)
+    img = Image.merge('RGB', (noise, gradient, noise))
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=90)
+    return output.getvalue()
+
+
+def throughput(func, iterations):
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    profiles = list(RESIZE_PROFILES)
+    
+    print(f"Images per second, {iterations} runs each")
+    header = f"{'input':<10}{'operation':<18}" + "".join(f"{name:>10}" for name in profiles)
+    print(header)
+    for label, size in SIZES:
+        file_data = make_jpeg(size)
+        for operation, func in (
+            ("create_thumbnail", ImageProcessor.create_thumbnail),
+            ("process_image", lambda data, quality: ImageProcessor.process_image(data, None, quality)),
+        ):
+            rates = [
+                throughput(lambda: func(file_data, quality=name), iterations)
+                for name in profiles
+            ]
+            print(f"{label:<10}{operation:<18}" + "".join(f"{rate:>10.2f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import io
+import time
+import pytest
+import redis
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.datastructures import Headers, UploadFile
+from app.core import database, deps
+from app.core.cache import derivative_cache, object_cache, presigned_url_cache
+from app.core.rate_limit import limiter
+from app.core.redis import redis_client
+from app.core.security import create_access_token
+from app.core.storage import storage_client
+from app.core.storage_fallback import local_storage_client
+from app.models import User
+
+
+class FakeRedis:
+    """In-memory stand-in for the Redis commands the app uses"""
+    
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+    
+    def _live(self, key):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+    
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self._live(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if ex:
+            self.expires[key] = time.time() + ex
+        return True
+    
+    def get(self, key):
+        return self.data[key] if self._live(key) else None
+    
+    def delete(self, *keys):
+        return sum(self._live(key) and self.data.pop(key, None) is not None for key in keys)
+    
+    def exists(self, key):
+        return int(self._live(key))
+    
+    def rename(self, source, target):
+        if not self._live(source):
+            raise redis.ResponseError("no such key")
+        self.data[target] = self.data.pop(source)
+    
+    def hincrby(self, key, member, amount):
+        counts = self.data.setdefault(key, {})
+        counts[str(member)] = str(int(counts.get(str(member), 0)) + amount)
+    
+    def hsetnx(self, key, field, value):
+        return self.data[key].setdefault(field, value) == value
+    
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+    
+    def hmget(self, key, members):
+        counts = self.data.get(key, {})
+        return [counts.get(str(member)) for member in members]
+    
+    def pipeline(self):
+        client = self
+        
+        class Pipeline:
+            def __init__(self):
+                self.results = []
+            
+            def hmget(self, key, members):
+                self.results.append(client.hmget(key, members))
+            
+            def execute(self):
+                return self.results
+        
+        return Pipeline()
+    
+    def eval(self, script, numkeys, key, token):
+        # RELEASE_LOCK_SCRIPT
+        if self.get(key) != token:
+            return 0
+        return self.delete(key)
+    
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+    
+    def blpop(self, key, timeout=0):
+        items = self.data.get(key)
+        return (key, items.pop(0)) if items else None
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(redis_client, "client", client)
+    return client
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Local storage fallback rooted in a temporary directory"""
+    monkeypatch.setattr(storage_client, "client", None)
+    monkeypatch.setattr(storage_client, "_client_initialized", True)
+    monkeypatch.setattr(local_storage_client, "storage_path", tmp_path)
+    yield local_storage_client
+    for cache in (derivative_cache, object_cache, presigned_url_cache):
+        cache.delete_prefix("")
+
+
+@pytest.fixture
+def client(db, storage, fake_redis, monkeypatch):
+    def get_db():
+        yield db
+    
+    from app.main import app
+    monkeypatch.setattr(limiter, "enabled", False)
+    monkeypatch.setitem(app.dependency_overrides, deps.get_db, get_db)
+    monkeypatch.setitem(app.dependency_overrides, database.get_db, get_db)
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_user(db):
+    def make_user(username="alice", **fields):
+        user = User(
+            email=f"{username}@example.com",
+            username=username,
+            hashed_password="x",
+            is_verified=True,
+            **fields
+        )
+        db.add(user)
+        db.commit()
+        return user
+    return make_user
+
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+def upload_file(data: bytes, filename: str, content_type: str = "application/octet-stream") -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(data),
+        size=len(data),
+        filename=filename,
+        headers=Headers({"content-type": content_type})
+    )
@@ -0,0 +1,65 @@
+import io
+import zipfile
+import pytest
+from app.core.config import settings
+from app.services.archive_service import ArchiveService
+
+
+def make_archive(entries):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return output
+
+
+def test_list_entries_skips_directories_and_metadata():
+    output = make_archive({"docs/": b"", "docs/a.txt": b"hello", "__MACOSX/._a.txt": b"x", ".DS_Store": b"x"})
+    with zipfile.ZipFile(output) as archive:
+        entries = ArchiveService.list_entries(archive, len(output.getvalue()))
+    assert [info.filename for info in entries] == ["docs/a.txt"]
+
+
+def test_list_entries_rejects_expansion():
+    output = make_archive({"a.txt": b"a" * 1_000_000})
+    with zipfile.ZipFile(output) as archive:
+        with pytest.raises(ValueError):
+            ArchiveService.list_entries(archive, len(output.getvalue()))
+
+
+def test_read_entry():
+    output = make_archive({"docs/notes.txt": b"hello world"})
+    with zipfile.ZipFile(output) as archive:
+        entry = ArchiveService.read_entry(archive, archive.getinfo("docs/notes.txt"))
+    assert entry.filename == "notes.txt"
+    assert entry.content_type == "text/plain"
+    assert entry.file.read() == b"hello world"
+
+
+def test_read_entry_rejects_compression_ratio():
+    output = make_archive({"bomb.txt": b"a" * (settings.max_archive_ratio * 2000)})
+    with zipfile.ZipFile(output) as archive:
+        with pytest.raises(ValueError):
+            ArchiveService.read_entry(archive, archive.getinfo("bomb.txt"))
+
+
+def test_zip_stream_round_trip():
+    from app.core.storage_fallback import ObjectStream
+    from app.utils.stream import ZipEntry, ZipStream
+    
+    data = bytes(range(256)) * 4096
+    entries = [
+        ZipEntry("a.bin", (2024, 1, 1, 0, 0, 0), zipfile.ZIP_DEFLATED,
+                 lambda: ObjectStream(io.BytesIO(data), len(data), 65536)),
+        # Sources of unknown size are written as ZIP64 entries
+        ZipEntry("b.jpg", (2024, 1, 1, 0, 0, 0), zipfile.ZIP_STORED,
+                 lambda: ObjectStream(io.BytesIO(data), None, 65536)),
+    ]
+    chunks = list(ZipStream(entries))
+    assert max(len(chunk) for chunk in chunks) < 2 * 65536
+    
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.read("a.bin") == data
+        assert archive.getinfo("b.jpg").compress_type == zipfile.ZIP_STORED
+        assert archive.read("b.jpg") == data
@@ -0,0 +1,19 @@
+from app.core.cache import ByteLRUCache
+
+
+def test_byte_lru_cache_metrics():
+    cache = ByteLRUCache(max_bytes=10, max_item_bytes=6)
+    assert cache.get("a") is None
+    assert cache.set("a", b"aaaa")
+    assert not cache.set("big", b"x" * 7)
+    assert cache.get("a") == b"aaaa"
+    
+    cache.set("b", b"bbbb")
+    cache.set("c", b"cccc")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
+    assert stats["bytes"] == 8 and stats["entries"] == 2
+    assert cache.get("a") is None
+    
+    assert cache.delete_prefix("b") == 1
+    assert cache.stats()["bytes"] == 4
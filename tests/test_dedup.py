@@ -0,0 +1,95 @@
+import asyncio
+from app.models import Blob, File
+from app.services.file_service import FileService
+from conftest import upload_file
+
+
+def upload(db, user, data, filename="notes.txt"):
+    return asyncio.run(FileService.upload_file(db, upload_file(data, filename), user))
+
+
+def prepare(db, user, data, filename="notes.txt"):
+    return asyncio.run(FileService.prepare_upload(db, upload_file(data, filename), user))
+
+
+def test_batch_survives_blob_deleted_before_save(db, storage, make_user):
+    user = make_user()
+    original = upload(db, user, b"shared content")
+    duplicate = prepare(db, user, b"shared content")
+    other = prepare(db, user, b"other content")
+    assert duplicate.blob_id == original.blob_id
+    
+    # The only other reference goes away between preparing and saving
+    FileService.delete_file(db, original)
+    assert db.query(Blob).count() == 0
+    
+    records = FileService.save_file_records(db, user, [duplicate, other])
+    assert records[0] is None
+    assert records[1].file_path == other.object_path
+    assert storage.stat_file(other.object_path)
+
+
+def test_batch_restores_content_of_deleted_blob(db, storage, make_user):
+    user = make_user()
+    original = upload(db, user, b"shared content")
+    sources = [upload_file(b"shared content", "a.txt"), upload_file(b"other content", "b.txt")]
+    outcomes = [asyncio.run(FileService.prepare_upload(db, source, user)) for source in sources]
+    FileService.delete_file(db, original)
+    
+    results = asyncio.run(FileService.save_batch(db, user, outcomes, sources=sources))
+    assert [error for _, error in results] == [None, None]
+    restored = results[0][0]
+    assert storage.download_file(restored.file_path) == b"shared content"
+    assert db.query(File).count() == 2
+
+
+def test_save_relinks_to_blob_stored_again(db, storage, make_user):
+    user = make_user()
+    original = upload(db, user, b"shared content")
+    duplicate = prepare(db, user, b"shared content")
+    FileService.delete_file(db, original)
+    # Someone else uploads the same content again, possibly reusing the blob id
+    again = upload(db, make_user("bob"), b"shared content")
+    
+    db_file = FileService._save_file_record(db, user, duplicate, None, False)
+    assert db_file.blob_id == again.blob_id
+    assert db.get(Blob, again.blob_id).ref_count == 2
+
+
+def test_duplicate_upload_shares_one_blob(db, storage, make_user):
+    first = upload(db, make_user(), b"same bytes", "a.txt")
+    second = upload(db, make_user("bob"), b"same bytes", "b.txt")
+    
+    assert first.id != second.id
+    assert first.blob_id == second.blob_id
+    assert first.file_path == second.file_path == FileService.blob_object_path(first.blob.content_hash)
+    assert db.query(Blob).count() == 1
+    assert db.get(Blob, first.blob_id).ref_count == 2
+
+
+def test_delete_keeps_shared_object_until_last_reference(db, storage, make_user):
+    first = upload(db, make_user(), b"same bytes", "a.txt")
+    second = upload(db, make_user("bob"), b"same bytes", "b.txt")
+    blob_id, object_path = first.blob_id, first.file_path
+    
+    FileService.delete_file(db, first)
+    assert db.get(Blob, blob_id).ref_count == 1
+    assert storage.download_file(object_path) == b"same bytes"
+    
+    FileService.delete_file(db, second)
+    assert db.get(Blob, blob_id) is None
+    assert storage.stat_file(object_path) is None
+
+
+def test_concurrent_first_upload_links_to_winner(db, storage, make_user):
+    user = make_user()
+    # Both uploads hashed the content before either registered a blob
+    loser = prepare(db, user, b"same bytes", "a.txt")
+    winner = upload(db, make_user("bob"), b"same bytes", "b.txt")
+    assert loser.blob_id is None
+    
+    db_file = FileService._save_file_record(db, user, loser, None, False)
+    assert db_file.blob_id == winner.blob_id
+    assert db.query(Blob).count() == 1
+    assert db.get(Blob, winner.blob_id).ref_count == 2
+    assert storage.download_file(db_file.file_path) == b"same bytes"
@@ -0,0 +1,99 @@
+import asyncio
+import io
+import json
+import pytest
+from PIL import Image
+from app.core.config import settings
+from app.models import File
+from app.services.file_service import DERIVATIVE_QUEUE, FileService
+from app.workers import derivatives
+from conftest import upload_file
+
+
+def make_jpeg(size=(2400, 1600)):
+    output = io.BytesIO()
+    Image.new("RGB", size, (200, 50, 50)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def queued(db, storage, fake_redis, make_user, monkeypatch):
+    """A user and a helper uploading images that are left to the derivative queue"""
+    monkeypatch.setattr(settings, "derivative_mode", "queue")
+    monkeypatch.setattr(derivatives, "SessionLocal", lambda: db)
+    monkeypatch.setattr(derivatives, "RETRY_DELAY", 0)
+    user = make_user()
+    
+    def upload(data, filename="photo.jpg"):
+        return asyncio.run(FileService.upload_file(db, upload_file(data, filename), user))
+    return user, upload
+
+
+def queued_ids(fake_redis):
+    return [json.loads(job)["file_id"] for job in fake_redis.data.get(f"queue:{DERIVATIVE_QUEUE}", [])]
+
+
+def test_generate_derivatives_replaces_original(db, storage, queued):
+    _, upload = queued
+    file = upload(make_jpeg())
+    original_path = file.file_path
+    assert file.processing_status == "pending"
+    
+    assert FileService.generate_derivatives(db, file) is True
+    assert file.processing_status == "ready"
+    assert file.file_path != original_path
+    assert file.blob.object_path == file.file_path
+    assert set(file.renditions) == {"thumbnail", "medium"}
+    assert storage.stat_file(original_path) is None
+    assert storage.stat_file(file.file_path)["size"] == file.file_size
+
+
+def test_busy_blob_lock_requeues_job(db, fake_redis, queued):
+    _, upload = queued
+    file = upload(make_jpeg())
+    fake_redis.data[f"queue:{DERIVATIVE_QUEUE}"] = []
+    fake_redis.set(f"lock:derivatives:blob:{file.blob_id}", "other worker")
+    
+    assert FileService.generate_derivatives(db, file) is None
+    derivatives.process_job({"file_id": file.id})
+    assert queued_ids(fake_redis) == [file.id]
+    assert db.get(File, file.id).processing_status == "pending"
+
+
+def test_late_duplicate_copies_ready_results(db, storage, queued):
+    user, upload = queued
+    file = upload(make_jpeg())
+    # Prepared while the blob is processing, saved after it is done
+    file.processing_status = "processing"
+    db.commit()
+    duplicate = asyncio.run(FileService.prepare_upload(db, upload_file(make_jpeg(), "copy.jpg"), user))
+    assert duplicate.processing_status == "pending"
+    file.processing_status = "pending"
+    db.commit()
+    
+    assert FileService.generate_derivatives(db, file) is True
+    late = FileService._save_file_record(db, user, duplicate, None, False)
+    assert late.processing_status == "pending"
+    file_id, late_id = file.id, late.id
+    
+    derivatives.process_job({"file_id": late_id})
+    file, late = db.get(File, file_id), db.get(File, late_id)
+    assert late.processing_status == "ready"
+    assert (late.file_path, late.renditions) == (file.file_path, file.renditions)
+    assert storage.stat_file(late.file_path)
+
+
+def test_rows_missed_by_processing_keep_their_object(db, storage, queued, monkeypatch):
+    _, upload = queued
+    file = upload(make_jpeg())
+    duplicate = upload(make_jpeg(), "copy.jpg")
+    original_path = file.file_path
+    
+    # The duplicate is committed after the worker listed the blob's files
+    monkeypatch.setattr(FileService, "_blob_files", staticmethod(lambda db, target: [target]))
+    assert FileService.generate_derivatives(db, file) is True
+    
+    db.refresh(duplicate)
+    assert duplicate.file_path == file.file_path
+    assert duplicate.processing_status == "ready"
+    assert storage.stat_file(original_path) is None
@@ -0,0 +1,96 @@
+import pytest
+from urllib.parse import parse_qs, urlsplit
+from app.core.validation import upload_policy
+from conftest import auth_headers
+
+MAX_SIZE = 64
+
+
+@pytest.fixture
+def user(make_user, monkeypatch):
+    monkeypatch.setattr(upload_policy, "max_file_size", MAX_SIZE)
+    return make_user()
+
+
+def create_upload(client, user, filename, file_size):
+    return client.post(
+        "/api/v1/files/direct-uploads",
+        json={"filename": filename, "file_size": file_size},
+        headers=auth_headers(user)
+    )
+
+
+def upload(client, user, filename, data, file_size=None):
+    """Create a direct upload and PUT data to its signed URL"""
+    response = create_upload(client, user, filename, file_size or len(data))
+    assert response.status_code == 200, response.text
+    created = response.json()
+    put = client.put(created["upload_url"], content=data)
+    assert put.status_code == 200, put.text
+    return created
+
+
+def complete(client, user, upload_id):
+    return client.post(f"/api/v1/files/direct-uploads/{upload_id}/complete", headers=auth_headers(user))
+
+
+def object_path(created):
+    return urlsplit(created["upload_url"]).path.removeprefix("/api/v1/files/storage/")
+
+
+def test_direct_upload_round_trip(client, user):
+    created = upload(client, user, "notes.txt", b"stored without the API")
+    response = complete(client, user, created["id"])
+    assert response.status_code == 200, response.text
+    
+    download = client.get(f"/api/v1/files/{response.json()['id']}/download", headers=auth_headers(user))
+    assert download.content == b"stored without the API"
+
+
+def test_tampered_signature_is_forbidden(client, user, storage):
+    created = create_upload(client, user, "notes.txt", 5).json()
+    url = urlsplit(created["upload_url"])
+    params = parse_qs(url.query)
+    signature = params["signature"][0]
+    tampered = ("0" if signature[0] != "0" else "1") + signature[1:]
+    
+    response = client.put(url.path, params={"expires": params["expires"][0], "signature": tampered}, content=b"hello")
+    assert response.status_code == 403
+    
+    # Signed for one object, the URL can't write another
+    other = url.path.replace(".txt", "-other.txt")
+    response = client.put(other, params={"expires": params["expires"][0], "signature": signature}, content=b"hello")
+    assert response.status_code == 403
+    assert not any(storage.storage_path.rglob("*.txt"))
+
+
+def test_oversized_declared_size_is_rejected(client, user):
+    response = create_upload(client, user, "notes.txt", MAX_SIZE + 1)
+    assert response.status_code == 413
+
+
+def test_oversized_object_is_rejected_and_deleted(client, user, storage):
+    created = upload(client, user, "notes.txt", b"x" * (MAX_SIZE + 1), file_size=MAX_SIZE)
+    assert (storage.storage_path / object_path(created)).exists()
+    
+    response = complete(client, user, created["id"])
+    assert response.status_code == 413
+    assert not (storage.storage_path / object_path(created)).exists()
+    # The upload is gone with its object
+    assert complete(client, user, created["id"]).status_code == 404
+
+
+def test_size_mismatch_is_rejected_and_deleted(client, user, storage):
+    created = upload(client, user, "notes.txt", b"short", file_size=10)
+    
+    response = complete(client, user, created["id"])
+    assert response.status_code == 400
+    assert not (storage.storage_path / object_path(created)).exists()
+
+
+def test_sniff_mismatch_is_rejected_and_deleted(client, user, storage):
+    created = upload(client, user, "photo.png", b"not an image at all")
+    
+    response = complete(client, user, created["id"])
+    assert response.status_code == 415
+    assert not (storage.storage_path / object_path(created)).exists()
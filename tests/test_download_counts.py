@@ -0,0 +1,47 @@
+import pytest
+from app.core.redis import redis_client
+from app.models import File
+from app.services.file_service import FileService
+
+
+@pytest.fixture
+def file(db, make_user):
+    file = File(
+        filename="a.txt", original_filename="a.txt", file_path="uploads/a.txt",
+        file_size=1, content_type="text/plain", user_id=make_user().id
+    )
+    db.add(file)
+    db.commit()
+    return file
+
+
+def test_flush_applies_counts_once(fake_redis, db, file, monkeypatch):
+    for _ in range(3):
+        FileService.increment_download_count(db, file)
+    
+    # The flush dies after committing, before the batch is cleared from Redis
+    clear = redis_client.clear_taken_counters
+    monkeypatch.setattr(redis_client, "clear_taken_counters", lambda name: False)
+    assert FileService.flush_download_counts(db) == 3
+    assert "counter:downloads:flushing" in fake_redis.data
+    
+    monkeypatch.setattr(redis_client, "clear_taken_counters", clear)
+    FileService.increment_download_count(db, file)
+    assert FileService.flush_download_counts(db) == 0
+    assert FileService.flush_download_counts(db) == 1
+    
+    db.expire_all()
+    assert db.query(File).one().download_count == 4
+    assert not any(key.startswith(("counter:", "lock:")) for key in fake_redis.data)
+
+
+def test_release_lock_needs_its_token(fake_redis):
+    token = redis_client.acquire_lock("job", expire=60)
+    assert token
+    assert redis_client.acquire_lock("job", expire=60) is None
+    
+    # An expired lock taken over by another worker is left alone
+    fake_redis.data["lock:job"] = "other"
+    assert not redis_client.release_lock("job", token)
+    assert fake_redis.data["lock:job"] == "other"
+    assert redis_client.release_lock("job", "other")
@@ -0,0 +1,104 @@
+import pytest
+from app.core.config import settings
+from app.core.storage import storage_client
+from conftest import auth_headers
+
+CONTENT = b"download me"
+
+
+@pytest.fixture
+def owner(make_user):
+    return make_user()
+
+
+def upload(client, user, is_public):
+    response = client.post(
+        "/api/v1/files/upload",
+        files={"file": ("notes.txt", CONTENT, "text/plain")},
+        data={"is_public": str(is_public).lower()},
+        headers=auth_headers(user)
+    )
+    assert response.status_code == 200, response.text
+    return f"/api/v1/files/{response.json()['id']}/download"
+
+
+@pytest.fixture
+def redirect_mode(monkeypatch):
+    monkeypatch.setattr(settings, "download_mode", "redirect")
+
+
+@pytest.fixture
+def object_storage(monkeypatch):
+    """Pretend MinIO is reachable, signing URLs without contacting it"""
+    signed = []
+    
+    def get_file_url(object_name, expires=3600, response_headers=None):
+        signed.append((object_name, response_headers))
+        return f"https://minio.example/{object_name}?X-Amz-Signature=abc"
+    
+    monkeypatch.setattr(storage_client, "uses_object_storage", lambda: True)
+    monkeypatch.setattr(storage_client, "get_file_url", get_file_url)
+    return signed
+
+
+def test_private_file_needs_authentication(client, owner):
+    url = upload(client, owner, is_public=False)
+    
+    response = client.get(url)
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+def test_private_file_is_forbidden_to_other_users(client, owner, make_user):
+    url = upload(client, owner, is_public=False)
+    
+    response = client.get(url, headers=auth_headers(make_user("bob")))
+    assert response.status_code == 403
+
+
+def test_private_file_is_served_to_its_owner(client, owner):
+    url = upload(client, owner, is_public=False)
+    
+    response = client.get(url, headers=auth_headers(owner))
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+def test_public_file_is_served_to_anyone(client, owner):
+    url = upload(client, owner, is_public=True)
+    
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["cache-control"] == "public, no-cache"
+
+
+def test_redirect_mode_proxies_from_local_storage(client, owner, redirect_mode):
+    url = upload(client, owner, is_public=False)
+    
+    response = client.get(url, headers=auth_headers(owner), follow_redirects=False)
+    assert response.status_code == 200
+    assert "location" not in response.headers
+    assert response.content == CONTENT
+
+
+def test_redirect_mode_redirects_to_presigned_url(client, owner, redirect_mode, object_storage):
+    url = upload(client, owner, is_public=False)
+    
+    response = client.get(url, headers=auth_headers(owner), follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"].startswith("https://minio.example/blobs/")
+    # The signed URL grants access on its own, so neither it nor the redirect is cached
+    assert response.headers["cache-control"] == "private, no-store"
+    object_name, response_headers = object_storage[-1]
+    assert response_headers["response-content-disposition"] == "attachment; filename=notes.txt"
+
+
+def test_redirect_mode_checks_access_first(client, owner, make_user, redirect_mode, object_storage):
+    url = upload(client, owner, is_public=False)
+    object_storage.clear()
+    
+    assert client.get(url, follow_redirects=False).status_code == 401
+    assert client.get(url, headers=auth_headers(make_user("bob")), follow_redirects=False).status_code == 403
+    assert object_storage == []
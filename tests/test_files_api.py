@@ -0,0 +1,81 @@
+import io
+from PIL import Image
+from app.models import File
+from conftest import auth_headers
+
+
+def make_png(size=(1200, 900)):
+    output = io.BytesIO()
+    Image.new("RGB", size, (20, 120, 200)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def upload(client, user, data, filename, is_public=False):
+    response = client.post(
+        "/api/v1/files/upload",
+        files={"file": (filename, data, "application/octet-stream")},
+        data={"is_public": str(is_public).lower()},
+        headers=auth_headers(user)
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_upload_rendition_urls_match_file_schema(client, make_user):
+    user = make_user()
+    uploaded = upload(client, user, make_png(), "photo.png")
+    
+    info = client.get(f"/api/v1/files/{uploaded['id']}", headers=auth_headers(user)).json()
+    assert uploaded["rendition_urls"] == info["rendition_urls"]
+    assert uploaded["thumbnail_url"] == info["rendition_urls"]["thumbnail"]
+    for name, url in uploaded["rendition_urls"].items():
+        response = client.get(url, headers=auth_headers(user))
+        assert response.status_code == 200, name
+        assert response.headers["content-type"].startswith("image/")
+
+
+def test_upload_multiple_reports_each_file(client, db, make_user):
+    user = make_user()
+    response = client.post(
+        "/api/v1/files/upload-multiple",
+        files=[
+            ("files", ("first.txt", b"first file", "text/plain")),
+            ("files", ("fake.png", b"not an image", "image/png")),
+            ("files", ("script.exe", b"MZ", "application/octet-stream")),
+            ("files", ("last.txt", b"last file", "text/plain")),
+        ],
+        headers=auth_headers(user)
+    )
+    assert response.status_code == 200, response.text
+    
+    results = response.json()
+    assert [result["filename"] for result in results] == ["first.txt", "fake.png", "script.exe", "last.txt"]
+    assert [result["success"] for result in results] == [True, False, False, True]
+    assert "does not match" in results[1]["error"]
+    assert ".exe" in results[2]["error"]
+    assert results[1]["file"] is None and results[2]["file"] is None
+    
+    stored = db.query(File).filter(File.user_id == user.id).order_by(File.id).all()
+    assert [file.original_filename for file in stored] == ["first.txt", "last.txt"]
+    for result, content in ((results[0], b"first file"), (results[3], b"last file")):
+        download = client.get(f"/api/v1/files/{result['file']['id']}/download", headers=auth_headers(user))
+        assert download.content == content
+
+
+def test_download_negotiates_format_only_for_image_requests(client, make_user):
+    user = make_user()
+    uploaded = upload(client, user, make_png((40, 30)), "photo.png")
+    url = f"/api/v1/files/{uploaded['id']}/download"
+    stored = client.get(url, headers=auth_headers(user)).content
+    
+    navigation = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
+    response = client.get(url, headers={**auth_headers(user), "Accept": navigation})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == stored
+    assert "photo.png" in response.headers["content-disposition"]
+    
+    response = client.get(url, headers={**auth_headers(user), "Accept": "image/webp,*/*"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert "photo.webp" in response.headers["content-disposition"]
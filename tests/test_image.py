@@ -0,0 +1,61 @@
+import io
+from PIL import Image
+from app.utils.image import ImageProcessor
+
+
+def make_image(size, mode='RGB', format='JPEG'):
+    output = io.BytesIO()
+    color = (200, 50, 50, 128) if mode == 'RGBA' else (200, 50, 50)
+    Image.new(mode, size, color).save(output, format=format)
+    return output.getvalue()
+
+
+def test_process_image_single_pass():
+    processed = ImageProcessor.process_image(make_image((4000, 3000)))
+    assert processed is not None
+    assert (processed.width, processed.height) == (4000, 3000)
+    assert processed.format == 'jpeg'
+    
+    with Image.open(io.BytesIO(processed.optimized)) as img:
+        assert img.size == (1920, 1440)
+    
+    with Image.open(io.BytesIO(processed.thumbnails["thumbnail"])) as img:
+        assert img.size == (200, 150)
+
+
+def test_process_image_renditions():
+    processed = ImageProcessor.process_image(make_image((4000, 3000)))
+    assert set(processed.thumbnails) == {"thumbnail", "medium"}
+    
+    with Image.open(io.BytesIO(processed.thumbnails["medium"])) as img:
+        assert img.size == (800, 600)
+    
+    # Images that already fit a rendition size are not re-encoded for it
+    small = ImageProcessor.process_image(make_image((640, 480)))
+    assert set(small.thumbnails) == {"thumbnail"}
+
+
+def test_process_image_flattens_transparency():
+    processed = ImageProcessor.process_image(make_image((300, 300), 'RGBA', 'PNG'))
+    assert processed is not None
+    
+    with Image.open(io.BytesIO(processed.optimized)) as img:
+        assert img.format == 'JPEG'
+        assert img.mode == 'RGB'
+
+
+def test_process_image_invalid_data():
+    assert ImageProcessor.process_image(b"not an image") is None
+
+
+def test_negotiate_image_format():
+    from app.utils.http import negotiate_image_format
+    
+    assert negotiate_image_format("image/avif,image/webp,*/*", ["avif", "webp"]) == "avif"
+    assert negotiate_image_format("image/avif;q=0,image/webp", ["avif", "webp"]) == "webp"
+    # Wildcards alone never opt a client into newer formats
+    assert negotiate_image_format("image/*,*/*;q=0.8", ["avif", "webp"]) is None
+    assert negotiate_image_format(None, ["webp"]) is None
+    # Browser navigations download the stored file
+    navigation = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
+    assert negotiate_image_format(navigation, ["avif", "webp"]) is None
@@ -0,0 +1,52 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.exceptions import FileSizeException
+from app.core.request_limits import FORM_OVERHEAD, RequestSizeLimitMiddleware, get_body_limit
+
+app = FastAPI()
+app.add_middleware(RequestSizeLimitMiddleware)
+
+
+@app.post("/echo")
+async def echo(request: Request):
+    return {"size": len(await request.body())}
+
+
+@app.post("/api/v1/files/upload-archive")
+async def upload_archive(request: Request):
+    return {"size": len(await request.body())}
+
+
+client = TestClient(app)
+LIMIT = settings.max_file_size + FORM_OVERHEAD
+
+
+def test_body_within_limit():
+    response = client.post("/echo", content=b"x" * 1024)
+    assert response.status_code == 200
+    assert response.json() == {"size": 1024}
+
+
+def test_declared_content_length_rejected():
+    response = client.post("/echo", content=b"", headers={"content-length": str(LIMIT + 1)})
+    assert response.status_code == 413
+    assert response.json()["error"] == FileSizeException(settings.max_file_size).detail
+
+
+def test_streamed_body_rejected():
+    def chunks():
+        sent = 0
+        while sent <= LIMIT:
+            sent += 1024 * 1024
+            yield b"x" * (1024 * 1024)
+    
+    response = client.post("/echo", content=chunks())
+    assert response.status_code == 413
+
+
+def test_route_limit_reported():
+    path = "/api/v1/files/upload-archive"
+    response = client.post(path, content=b"", headers={"content-length": str(get_body_limit(path) + 1)})
+    assert response.status_code == 413
+    assert response.json()["error"] == FileSizeException(settings.max_archive_size).detail
@@ -0,0 +1,163 @@
+import io
+from app.core.storage_fallback import ObjectStream
+
+
+class Handle(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.released = False
+    
+    def release(self):
+        self.released = True
+
+
+def test_object_stream_chunks_and_releases():
+    handle = Handle(b"x" * 10)
+    stream = ObjectStream(handle, 10, 4, release=handle.release)
+    assert [len(chunk) for chunk in stream] == [4, 4, 2]
+    assert handle.closed and handle.released
+
+
+def test_object_stream_close_before_iteration():
+    handle = Handle(b"x" * 10)
+    stream = ObjectStream(handle, 10, 4, release=handle.release)
+    stream.close()
+    stream.close()
+    assert handle.closed and handle.released
+    assert list(stream) == []
+
+
+def test_object_stream_stops_at_size():
+    handle = Handle(b"x" * 10)
+    assert b"".join(ObjectStream(handle, 3, 2)) == b"xxx"
+
+
+def test_parse_range():
+    from app.utils.http import parse_range
+    
+    assert parse_range("bytes=0-9", 100) == [(0, 9)]
+    assert parse_range("bytes=90-, -5", 100) == [(90, 99), (95, 99)]
+    assert parse_range("bytes=50-500", 100) == [(50, 99)]
+    # Unsatisfiable ranges are dropped; none left means 416
+    assert parse_range("bytes=100-", 100) == []
+    # Malformed headers are ignored and the whole object is served
+    assert parse_range("bytes=9-0", 100) is None
+    assert parse_range("items=0-9", 100) is None
+
+
+def test_byte_ranges_stream():
+    from app.utils.stream import ByteRangesStream
+    
+    data = bytes(range(100))
+    body = ByteRangesStream(
+        lambda offset, length: ObjectStream(io.BytesIO(data[offset:]), length, 8),
+        [(0, 9), (50, 59)],
+        len(data),
+        "application/pdf",
+        "sep"
+    )
+    content = b"".join(body)
+    assert len(content) == body.content_length
+    assert b"Content-Range: bytes 50-59/100\r\n\r\n" + data[50:60] + b"\r\n--sep--\r\n" in content
+
+
+def test_conditional_validators():
+    from datetime import datetime
+    from app.utils.http import http_date, if_range_matches, is_not_modified
+    
+    modified = datetime(2024, 1, 2, 3, 4, 5, 600)
+    assert http_date(modified) == "Tue, 02 Jan 2024 03:04:05 GMT"
+    assert is_not_modified('W/"a", "b"', None, '"b"', modified)
+    # If-None-Match takes precedence over If-Modified-Since
+    assert not is_not_modified('"c"', http_date(modified), '"b"', modified)
+    assert is_not_modified(None, http_date(modified), '"b"', modified)
+    assert not is_not_modified(None, "Mon, 01 Jan 2024 00:00:00 GMT", '"b"', modified)
+    
+    assert if_range_matches(None, '"b"', modified)
+    assert if_range_matches('"b"', '"b"', modified)
+    assert not if_range_matches('W/"b"', '"b"', modified)
+
+
+def test_sendfile_response(tmp_path):
+    import asyncio
+    from app.utils.responses import ZEROCOPY_EXTENSION, SendfileResponse
+    
+    path = tmp_path / "object.bin"
+    path.write_bytes(bytes(range(100)))
+    
+    async def run(extensions):
+        messages = []
+        
+        async def receive():
+            await asyncio.sleep(1)
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            messages.append(message)
+        
+        response = SendfileResponse(str(path), [b"<", (10, 5), b">"], media_type="application/octet-stream")
+        await response({"type": "http", "extensions": extensions}, receive, send)
+        return messages
+    
+    messages = asyncio.run(run({}))
+    assert messages[0]["status"] == 200
+    assert (b"content-length", b"7") in messages[0]["headers"]
+    assert b"".join(message.get("body", b"") for message in messages[1:]) == b"<" + bytes(range(10, 15)) + b">"
+    
+    messages = asyncio.run(run({ZEROCOPY_EXTENSION: {}}))
+    zerocopy = [message for message in messages if message["type"] == ZEROCOPY_EXTENSION]
+    assert [(message["offset"], message["count"]) for message in zerocopy] == [(10, 5)]
+
+
+def test_presigned_urls_are_reused_within_a_window(monkeypatch):
+    from app.core import storage
+    from app.core.config import settings
+    
+    signed = []
+    
+    class FakeMinio:
+        def presigned_get_object(self, bucket, object_name, expires, response_headers, request_date):
+            signed.append((request_date, expires))
+            return f"https://minio/{object_name}?date={request_date.timestamp():.0f}&n={len(signed)}"
+    
+    client = storage.MinIOClient()
+    client.client = FakeMinio()
+    client._client_initialized = True
+    now = [settings.presigned_url_window * 1000 + 10]
+    monkeypatch.setattr(storage.time, "time", lambda: now[0])
+    
+    first = client.get_file_url("a.txt", 300)
+    now[0] += 30
+    assert client.get_file_url("a.txt", 300) == first
+    assert len(signed) == 1
+    assert signed[0][1].total_seconds() == 300 + settings.presigned_url_window
+    
+    now[0] += settings.presigned_url_window
+    assert client.get_file_url("a.txt", 300) != first
+    assert len(signed) == 2
+
+
+def test_upload_objects_rollback_keeps_existing_objects(monkeypatch):
+    import asyncio
+    from app.core import storage
+    
+    stored = {"blobs/ab/abc": b"shared"}
+    deleted = []
+    client = storage.MinIOClient()
+    monkeypatch.setattr(client, "stat_file", lambda name: {"size": len(stored[name])} if name in stored else None)
+    monkeypatch.setattr(client, "delete_file", deleted.append)
+    
+    def upload_file(data, name, content_type, size):
+        if name == "renditions/medium/abc":
+            return False
+        stored[name] = data.read()
+        return True
+    
+    monkeypatch.setattr(client, "upload_file", upload_file)
+    objects = [
+        ("blobs/ab/abc", b"shared", "image/jpeg"),
+        ("thumbnails/thumb_abc", b"thumb", "image/jpeg"),
+        ("renditions/medium/abc", b"medium", "image/jpeg"),
+    ]
+    assert asyncio.run(client.upload_objects(objects)) is False
+    assert deleted == ["thumbnails/thumb_abc"]
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.core.config import settings
+from app.core.storage import storage_client
+from conftest import auth_headers
+
+PART_SIZE = 8
+CONTENT = b"resumable upload content"
+
+
+@pytest.fixture
+def user(make_user, monkeypatch):
+    monkeypatch.setattr(settings, "upload_part_size", PART_SIZE)
+    return make_user()
+
+
+def create_session(client, user, content=CONTENT):
+    response = client.post(
+        "/api/v1/files/uploads",
+        json={"filename": "notes.txt", "file_size": len(content)},
+        headers=auth_headers(user)
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def put_chunk(client, user, session_id, offset, data):
+    return client.put(
+        f"/api/v1/files/uploads/{session_id}",
+        params={"offset": offset},
+        content=data,
+        headers=auth_headers(user)
+    )
+
+
+def off_event_loop(func):
+    """Wrap func to record whether each call ran on the event loop thread"""
+    calls = []
+    
+    def wrapper(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("worker thread")
+        return func(*args, **kwargs)
+    return wrapper, calls
+
+
+def test_session_upload_round_trip(client, user, monkeypatch):
+    session = create_session(client, user)
+    for offset in range(0, len(CONTENT), PART_SIZE):
+        response = put_chunk(client, user, session["id"], offset, CONTENT[offset:offset + PART_SIZE])
+        assert response.status_code == 200, response.text
+        assert response.json()["offset"] == min(offset + PART_SIZE, len(CONTENT))
+    
+    status = client.get(f"/api/v1/files/uploads/{session['id']}", headers=auth_headers(user)).json()
+    assert status["offset"] == len(CONTENT)
+    
+    complete, calls = off_event_loop(storage_client.complete_multipart_upload)
+    monkeypatch.setattr(storage_client, "complete_multipart_upload", complete)
+    response = client.post(f"/api/v1/files/uploads/{session['id']}/complete", headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+    assert calls == ["worker thread"]
+    
+    download = client.get(f"/api/v1/files/{response.json()['id']}/download", headers=auth_headers(user))
+    assert download.status_code == 200
+    assert download.content == CONTENT
+    
+    # The session is gone once the file exists
+    status = client.get(f"/api/v1/files/uploads/{session['id']}", headers=auth_headers(user))
+    assert status.status_code == 404
+
+
+def test_chunk_at_wrong_offset_conflicts(client, user):
+    session = create_session(client, user)
+    assert put_chunk(client, user, session["id"], 0, CONTENT[:PART_SIZE]).status_code == 200
+    
+    response = put_chunk(client, user, session["id"], 0, CONTENT[:PART_SIZE])
+    assert response.status_code == 409
+    response = put_chunk(client, user, session["id"], 2 * PART_SIZE, CONTENT[2 * PART_SIZE:3 * PART_SIZE])
+    assert response.status_code == 409
+
+
+def test_incomplete_session_cannot_complete(client, user):
+    session = create_session(client, user)
+    put_chunk(client, user, session["id"], 0, CONTENT[:PART_SIZE])
+    response = client.post(f"/api/v1/files/uploads/{session['id']}/complete", headers=auth_headers(user))
+    assert response.status_code == 400
+
+
+def test_expired_session_is_rejected(client, user, fake_redis):
+    session = create_session(client, user)
+    key = f"upload_session:{session['id']}"
+    assert fake_redis.expires[key] > 0
+    fake_redis.expires[key] = 0
+    
+    assert client.get(f"/api/v1/files/uploads/{session['id']}", headers=auth_headers(user)).status_code == 404
+    assert put_chunk(client, user, session["id"], 0, CONTENT[:PART_SIZE]).status_code == 404
+    response = client.post(f"/api/v1/files/uploads/{session['id']}/complete", headers=auth_headers(user))
+    assert response.status_code == 404
+
+
+def test_sessions_are_private_to_their_owner(client, user, make_user):
+    session = create_session(client, user)
+    other = make_user("bob")
+    assert client.get(f"/api/v1/files/uploads/{session['id']}", headers=auth_headers(other)).status_code == 403
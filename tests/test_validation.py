@@ -0,0 +1,56 @@
+import pytest
+from app.core.exceptions import FileTypeException
+from app.core.validation import UploadPolicy
+
+policy = UploadPolicy(max_file_size=1024, allowed_extensions=["jpg", "png", "pdf", "txt", "docx"])
+
+JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+PNG = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+
+
+def test_check_metadata():
+    assert policy.check_metadata("photo.JPG", 100) == (True, "Valid")
+    assert policy.check_metadata("run.exe", 100)[0] is False
+    assert policy.check_metadata("photo.jpg", 2048)[0] is False
+
+
+def test_sniff():
+    assert policy.sniff(JPEG) == "jpeg"
+    assert policy.sniff(PNG) == "png"
+    assert policy.sniff(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+    assert policy.sniff(b"%PDF-1.7\n") == "pdf"
+    assert policy.sniff("plain text, ünïcode".encode()) == "text"
+    assert policy.sniff("café au lait".encode("latin-1")) == "text"
+    assert policy.sniff(b"") == "text"
+    assert policy.sniff(b"\x00\x01\x02binary") is None
+
+
+def test_check_content_uses_sniffed_type():
+    # The declared type is replaced by the one matching the content
+    result = policy.check_content("photo.jpg", JPEG)
+    assert result.kind == "jpeg"
+    assert result.content_type == "image/jpeg"
+
+
+def test_check_content_rejects_mismatch():
+    with pytest.raises(FileTypeException) as exc:
+        policy.check_content("photo.jpg", PNG)
+    assert exc.value.status_code == 415
+    
+    with pytest.raises(FileTypeException):
+        policy.check_content("notes.txt", b"MZ\x90\x00\x03\x00\x00\x00")
+
+
+def test_check_content_accepts_empty_and_latin1_text():
+    assert policy.check_content("empty.txt", b"").content_type == "text/plain"
+    assert policy.check_content("notes.txt", "naïve résumé".encode("latin-1")).content_type == "text/plain"
+
+
+def test_check_content_ignores_declared_type():
+    # Unrecognized content is never served as the type the client claimed
+    result = policy.check_content("blob", b"\x00\x01\x02binary")
+    assert result.kind is None
+    assert result.content_type == "application/octet-stream"
+    
+    with pytest.raises(FileTypeException):
+        policy.check_content("photo.jpg", b"")